@@ -9,9 +9,47 @@ from _Framework.Layer import Layer
 from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_CC_TYPE
 from _Framework.ButtonMatrixElement import ButtonMatrixElement
 from functools import partial
+import os
+import time
 import Live
-import threading, Queue
-import datetime
+from SceneIndexTracker import SceneIndexTracker
+from InputRoutingIndex import InputRoutingIndex
+from DisarmQueue import DisarmQueue
+from SessionStateMirror import SessionStateMirror
+from HandlerStats import HandlerStats
+from MidiDispatcher import MidiDispatcher
+from SessionOffsetFollower import SessionOffsetFollower
+from TrackInsertPlan import TrackInsertPlan
+from ExpressionPedal import ExpressionPedal
+from DeadlineScheduler import DeadlineScheduler
+from PedalGestures import PedalGestures
+from ScriptLog import ScriptLog, DEBUG, INFO
+from PedalMapping import compile_mapping, MAPPING_VERSION
+from _Mapping.MappingFile import load_mapping
+from _Trace.MidiTrace import MidiTraceWriter
+from UndoTransaction import UndoTransaction
+from PedalDebouncer import PedalDebouncer
+
+# The actions that work on a clip slot, and get told which one was selected when the pedal went down
+CLIP_ACTIONS = ('fire_clip', 'delete_clip')
+
+def dropPressed(action, value, pressed=None):
+    """
+    Calls an action that doesn't take the slot captured for a clip pedal.
+    """
+    return action(value)
+
+def findIndex(liveObjects, liveObject, oldIndex):
+    """
+    Where liveObject is in liveObjects now, or None if it's gone. Tracks and scenes can't be
+    used as dict keys, and most layout changes only shift things by one, so look near where
+    it used to be first.
+    """
+    for index in (oldIndex, oldIndex+1, oldIndex-1) :
+        if 0<=index<len(liveObjects) and liveObjects[index]==liveObject : return index
+    for index in xrange( len(liveObjects) ) :
+        if liveObjects[index]==liveObject : return index
+    return None
 
 
 class CallOnceListener(object):
@@ -30,97 +68,235 @@ class CallOnceListener(object):
 class BehringerFCB1010(ControlSurface):
     NUMBER_OF_CONTROLS = 10 # The number of normal pedal buttons on the board, not including specials like "up"
     NUMBER_OF_EXPRESSION = 2 # The number of expression pedals available
-    MIDI_CHANNEL = 0
-    # The MIDI note number that each of the 10 pedals transmits (programmed on the board itself,
-    # these numbers are what I've set mine to).
-    PEDAL_MIDI_NOTES = [1,2,3,4,5,6,7,8,9,10]
-    # The MIDI CC number that each of the two expression pedals transmits
-    EXPRESSION_MIDI_CC = [27,28]
-    
-    FIRE_SCENE_MIDI_NOTES = [ (MIDI_NOTE_TYPE,MIDI_CHANNEL,6),
-                         (MIDI_NOTE_TYPE,MIDI_CHANNEL,7),
-                         (MIDI_NOTE_TYPE,MIDI_CHANNEL,8),
-                         (MIDI_NOTE_TYPE,MIDI_CHANNEL,9),
-                         (MIDI_NOTE_TYPE,MIDI_CHANNEL,10) ]
-
-    FIRE_CLIP_MIDI_NOTES = [ (MIDI_NOTE_TYPE,MIDI_CHANNEL,16),
-                        (MIDI_NOTE_TYPE,MIDI_CHANNEL,17),
-                        (MIDI_NOTE_TYPE,MIDI_CHANNEL,18),
-                        (MIDI_NOTE_TYPE,MIDI_CHANNEL,19),
-                        (MIDI_NOTE_TYPE,MIDI_CHANNEL,20) ]
-    BEGIN_RECORDING_MIDI_NOTES = [ (MIDI_NOTE_TYPE,MIDI_CHANNEL,1), (MIDI_NOTE_TYPE,MIDI_CHANNEL,11) ]
-    BEGIN_NEW_SCENE_MIDI_NOTES = [ (MIDI_NOTE_TYPE,MIDI_CHANNEL,2), (MIDI_NOTE_TYPE,MIDI_CHANNEL,12) ]
-    BEGIN_NEW_LAYER_MIDI_NOTES = [ (MIDI_NOTE_TYPE,MIDI_CHANNEL,3), (MIDI_NOTE_TYPE,MIDI_CHANNEL,13) ]
-    STOP_SONG_MIDI_NOTES = [ (MIDI_NOTE_TYPE,MIDI_CHANNEL,4), (MIDI_NOTE_TYPE,MIDI_CHANNEL,14) ]
-    TOGGLE_METRONOME_MIDI_NOTES = [ (MIDI_NOTE_TYPE,MIDI_CHANNEL,5), (MIDI_NOTE_TYPE,MIDI_CHANNEL,15) ]
+    # Which notes and CCs the pedals send and what they do in each bank, including the expression
+    # pedals' targets and response curves. See PedalMapping.compile_mapping for the format.
+    # The file is checked and compiled when the script starts, and the compiled form is cached
+    # alongside it until the file changes.
+    MAPPING_FILE = os.path.join( os.path.dirname(os.path.abspath(__file__)), 'FCB1010.json' )
+    # Whether Live's "Start Recording on Scene Launch" preference is on. Scripts can't read
+    # preferences, and launching the new scene is only the same as firing its slots one by one
+    # if armed tracks start recording when it's launched. It's off in a default install of
+    # Live, so only set this if you've turned the preference on.
+    SCENE_LAUNCH_RECORDS = False
+
+    # Set to True to compare the mirrored session state with Live on every press and log
+    # anything that doesn't match. Reads everything from Live, so only use it for debugging.
+    CHECK_SESSION_MIRROR = False
+    # Set to True to time every MIDI handler and update_display. The figures are logged by
+    # dump_handler_stats() and when the script is disconnected. When False nothing is wrapped,
+    # so it costs nothing.
+    INSTRUMENT_HANDLERS = False
+    # Gesture timings in seconds, see PedalGestures
+    HOLD_TIME = 2.0
+    LONG_PRESS_TIME = 4.0
+    DOUBLE_TAP_TIME = 0.3
+    # How often, in milliseconds, gesture deadlines are checked if Live provides a timer.
+    # Otherwise they're checked on every MIDI message and display tick.
+    GESTURE_TIMER_INTERVAL = 10
+    # Changes to a pedal within this many seconds of the last one are treated as bounces, see
+    # PedalDebouncer. Has to be shorter than DOUBLE_TAP_TIME. Set to 0 to pass everything straight
+    # to the handlers. What was filtered is logged when the script is disconnected.
+    DEBOUNCE_TIME = 0.05
+    # Messages below this level are thrown away without being formatted. Anything logged
+    # while handling MIDI is buffered and written out from update_display, see ScriptLog.
+    LOG_LEVEL = INFO
+    LOG_BUFFER_SIZE = 256
+    # Set to a file path to record every MIDI message the script receives, with timestamps, so
+    # that the session can be replayed with benchmarks/replay_trace.py. The path goes through
+    # time.strftime, so e.g. '/tmp/fcb1010-%Y%m%d-%H%M%S.midt' gives a new file each time.
+    MIDI_TRACE_FILE = None
 
     def __init__(self, *a, **k):
         super(BehringerFCB1010, self).__init__(*a, **k)
-        self.log_message("Starting Behringer FCB1010 script __init__")
+        self._log=ScriptLog(self.log_message, self.LOG_LEVEL, self.LOG_BUFFER_SIZE, prefix="Behringer ")
+        self._log.info("Starting Behringer FCB1010 script __init__")
         
-        self.tracksToDisarm=[]
-        # I can't figure out why, but I can't use clip slots as the key in a dict, I always get
-        # a key error when trying to retrieve. I'll store as a (key,value) tuple in a list and
-        # search manually. 
-        self.clipSlotTimers=[] # deletes the clip if it isn't cancelled before finishing. Key is the clip slot
-        self.buttonHoldTime=datetime.timedelta(0,2)
+        self._handlerStats=HandlerStats() if self.INSTRUMENT_HANDLERS else None
+        if self._handlerStats is not None :
+            # Live calls update_display through the instance, so this shadows the method
+            self.update_display=self._handlerStats.wrap('update_display', self.update_display)
         # I've already set up the board so that it transmits note C#-2 for pedal 1, D-2 for pedal 3 and so on
         # (increasing each time by one semitone) the MIDI number for note C#-2 is 1 (hence why I chose it for
-        # pedal 1). These are hard coded in the PEDAL_MIDI_NOTES array. Note that this is for bank 00. At the
-        # moment I'm ignoring the "Up" and "Down" pedals because they change all the other pedals.
+        # pedal 1). These are set in MAPPING_FILE. Note that this is for bank 00. The "Up" and "Down" pedals
+        # switch between the banks in BANKS.
+        # The mapping sets MIDI_CHANNEL, BANKS, the *_MIDI_NOTES lists and the EXPRESSION_* lists on the instance.
+        for (name,value) in load_mapping(self.MAPPING_FILE, compile_mapping, MAPPING_VERSION).iteritems() :
+            setattr(self, name, value)
         with self.component_guard():
-            # Create the various buttons for specific things. Note that for each loop all
-            # of the buttons (if there is more than one note registered) does the same thing.
-            # When the bank changes I might want another button to do a particular function.
-            self._buttons = []
-            for midiNote in self.BEGIN_RECORDING_MIDI_NOTES :
-                button=ButtonElement( True, midiNote[0], midiNote[1], midiNote[2], name='Begin_recording_button%d' % (len(self._buttons)) )
-                button.add_value_listener( self.begin_recording_handler )
-                self._buttons.append( button )
-
-            for midiNote in self.BEGIN_NEW_SCENE_MIDI_NOTES :
-                button=ButtonElement( True, midiNote[0], midiNote[1], midiNote[2], name='Begin_new_scene_button%d' % (len(self._buttons)) )
-                button.add_value_listener( self.begin_recording_new_scene_handler )
-                self._buttons.append( button )
-
-            for midiNote in self.BEGIN_NEW_LAYER_MIDI_NOTES :
-                button=ButtonElement( True, midiNote[0], midiNote[1], midiNote[2], name='Begin_new_layer%d' % (len(self._buttons)) )
-                button.add_value_listener( self.playCurrentRecordingAndArmNext )
-                self._buttons.append( button )
-
-            for midiNote in self.STOP_SONG_MIDI_NOTES :
-                button=ButtonElement( True, midiNote[0], midiNote[1], midiNote[2], name='Stop_song_button%d' % (len(self._buttons)) )
-                button.add_value_listener( self.stopSong )
-                self._buttons.append( button )
-
-            for midiNote in self.TOGGLE_METRONOME_MIDI_NOTES :
-                button=ButtonElement( True, midiNote[0], midiNote[1], midiNote[2], name='Toggle_metronome%d' % (len(self._buttons)) )
-                button.add_value_listener( self.toggleMetronome )
-                self._buttons.append( button )
-
-            # Create and add listeners to all the buttons that fire a scene
-            self._fire_scene_buttons=[]
-            for index in xrange( len(self.FIRE_SCENE_MIDI_NOTES) ) :
-                midiNote=self.FIRE_SCENE_MIDI_NOTES[index]
-                button=ButtonElement( True, midiNote[0], midiNote[1], midiNote[2], name='Fire_scene_%d' % (index+1) )
-                button.add_value_listener( partial(self.fire_scene,sceneNumber=index) )
-                self._fire_scene_buttons.append( button )
-
-            # Create and add listeners to all the buttons that fire and delete clips
-            self._fire_clip_buttons=[]
-            for index in xrange( len(self.FIRE_CLIP_MIDI_NOTES) ) :
-                midiNote=self.FIRE_CLIP_MIDI_NOTES[index]
-                button=ButtonElement( True, midiNote[0], midiNote[1], midiNote[2], name='Fire_clip_%d' % (index+1) )
-                button.add_value_listener( partial(self.fire_clip,clipNumber=index) )
-                self._fire_clip_buttons.append( button )
-
-            # Define a function to say where the start of the highlighted region is. When all
-            # scripts are loaded I'll try and find another control surface and use that highlighted
-            # region. If I can't find one just work relative to the first clip.
-            self.scene_offset=lambda : 0
-            self.track_offset=lambda : 0
-
-        self.log_message("Finished Behringer FCB1010 script __init__")
+            # Rather than a ButtonElement for every note, incoming MIDI is looked up in a table
+            # for the current bank. All of the banks are built now so changing bank is free.
+            self._scheduler=DeadlineScheduler()
+            # Multi-step pedal actions are grouped into one undo step with this
+            self._transaction=UndoTransaction(self.song())
+            self._expressionPedals=[ ExpressionPedal(self.song(), target, curve) for (target,curve) in zip(self.EXPRESSION_TARGETS, self.EXPRESSION_CURVES) ]
+            self._dispatcher=self._build_dispatcher()
+            # A debounce window as long as a double tap would swallow the second press
+            if self.DEBOUNCE_TIME>=self.DOUBLE_TAP_TIME :
+                raise ValueError("DEBOUNCE_TIME (%gs) has to be shorter than DOUBLE_TAP_TIME (%gs)" % (self.DEBOUNCE_TIME, self.DOUBLE_TAP_TIME))
+            self._debouncer=None
+            if self.DEBOUNCE_TIME>0 :
+                # Notes the dispatcher doesn't know about are left alone and fall through to Live
+                self._debouncer=PedalDebouncer(self._scheduler, self._dispatcher.dispatch, self.DEBOUNCE_TIME,
+                                               self._dispatcher.handles, super(BehringerFCB1010, self).handle_nonsysex)
+
+            # Keeps track of where the start of the highlighted region is. When all scripts are
+            # loaded I'll try and find another control surface and follow its highlighted region.
+            # If I can't find one the offsets stay at zero, i.e. relative to the first clip.
+            self._sessionOffsets=SessionOffsetFollower()
+            self.register_disconnectable(self._sessionOffsets)
+
+            # Keeps the index of the selected scene up to date so that handlers don't need
+            # to search through all the scenes to find it.
+            self._sceneTracker=SceneIndexTracker(self.song())
+            self.register_disconnectable(self._sceneTracker)
+            # Which tracks with each input have a free slot in the selected scene, used when
+            # looking for somewhere to record the next layer.
+            self._routingIndex=InputRoutingIndex(self.song())
+            self.register_disconnectable(self._routingIndex)
+            # Tracks that need disarming once they've finished recording. I can't disarm tracks
+            # in listeners, so they're disarmed the next time update_display is called.
+            self.tracksToDisarm=DisarmQueue()
+            self.register_disconnectable(self.tracksToDisarm)
+            # Arm and clip slot state for the selected scene, so that the handlers don't need to
+            # ask Live for it on every press.
+            self._sessionState=SessionStateMirror(self.song())
+            self.register_disconnectable(self._sessionState)
+
+        # The display tick is too coarse for telling a tap from a double tap, so use a faster
+        # timer to check the gesture deadlines if this version of Live has one.
+        self._gestureTimer=None
+        if hasattr(Live, 'Base') and hasattr(Live.Base, 'Timer') :
+            self._gestureTimer=Live.Base.Timer(callback=self._scheduler.run_due, interval=self.GESTURE_TIMER_INTERVAL, repeat=True)
+            self._gestureTimer.start()
+
+        self._midiTrace=None
+        if self.MIDI_TRACE_FILE is not None :
+            try :
+                self._midiTrace=MidiTraceWriter(time.strftime(self.MIDI_TRACE_FILE), 'BehringerFCB1010', self._scheduler.clock)
+                self.register_disconnectable(self._midiTrace)
+                self._log.info("Recording MIDI to %s", self._midiTrace.path)
+            except IOError, error :
+                self._log.warning("Couldn't open MIDI trace file: %s", error)
+
+        self.request_rebuild_midi_map()
+        self._log.info("Finished Behringer FCB1010 script __init__")
+        self._log.flush()
+
+    def _build_dispatcher(self):
+        """
+        Builds the MIDI dispatch table for every bank in BANKS.
+        """
+        # The handler for each action name, and the name it's timed under if INSTRUMENT_HANDLERS is set
+        handlers={ 'begin_recording' : ('begin_recording_handler', self.begin_recording_handler),
+                   'begin_new_scene' : ('begin_recording_new_scene_handler', self.begin_recording_new_scene_handler),
+                   'begin_new_layer' : ('playCurrentRecordingAndArmNext', self.playCurrentRecordingAndArmNext),
+                   'stop_song' : ('stopSong', self.stopSong),
+                   'toggle_metronome' : ('toggleMetronome', self.toggleMetronome),
+                   'fire_scene' : ('fire_scene', lambda number : partial(self.fire_scene,sceneNumber=number)),
+                   'fire_clip' : ('fire_clip', lambda number : partial(self.fire_clip,clipNumber=number)),
+                   'delete_clip' : ('delete_clip', lambda number : partial(self.delete_clip,clipNumber=number)) }
+        # Handlers are shared between banks where possible so they're only wrapped once
+        compiled={}
+        banks=[]
+        for bankEntries in self.BANKS :
+            # Collect the gestures for each message first, since a pedal can have several
+            gestureActions={}
+            clipNumbers={} # For the clip pedals, which clip each one works on
+            clipGestures={} # and which of their gestures are clip actions
+            for (message,action,argument,gesture) in bankEntries :
+                if action in CLIP_ACTIONS : clipNumbers[tuple(message)]=argument
+                if (action,argument) not in compiled :
+                    (name,handler)=handlers[action]
+                    if argument is not None : handler=handler(argument)
+                    compiled[(action,argument)]=self._instrumented(name, handler)
+                gestureActions.setdefault(tuple(message), {})[gesture]=compiled[(action,argument)]
+                if action in CLIP_ACTIONS : clipGestures.setdefault(tuple(message), set()).add(gesture)
+            bank={}
+            for (message,actions) in gestureActions.iteritems() :
+                if actions.keys()==['press'] :
+                    # Nothing to recognise, the handler checks for the press itself
+                    bank[message]=actions['press']
+                else :
+                    # The clip pedals act on the slot that was selected when the pedal went down,
+                    # even if the selection has moved by the time the pedal is held or released
+                    capture=None
+                    if message in clipNumbers :
+                        capture=partial(self._pressed_clip_slot, clipNumbers[message])
+                        # Anything else on the same pedal doesn't take the slot, so leave it out
+                        for (gesture,action) in actions.items() :
+                            if gesture not in clipGestures[message] : actions[gesture]=partial(dropPressed, action)
+                    gestures=PedalGestures(self._scheduler, actions, self.HOLD_TIME, self.LONG_PRESS_TIME, self.DOUBLE_TAP_TIME, capture)
+                    bank[message]=gestures.receive_value
+            banks.append(bank)
+        alwaysActive={}
+        bankUp=self._instrumented('change_bank', partial(self.change_bank, step=1))
+        bankDown=self._instrumented('change_bank', partial(self.change_bank, step=-1))
+        for message in self.BANK_UP_MIDI_NOTES :
+            alwaysActive[tuple(message)]=bankUp
+        for message in self.BANK_DOWN_MIDI_NOTES :
+            alwaysActive[tuple(message)]=bankDown
+        # The expression pedals do the same thing in every bank
+        for (cc,pedal) in zip(self.EXPRESSION_MIDI_CC, self._expressionPedals) :
+            alwaysActive[(MIDI_CC_TYPE,self.MIDI_CHANNEL,cc)]=self._instrumented('expression_pedal', pedal.receive_value)
+        return MidiDispatcher(banks, alwaysActive)
+
+    def build_midi_map(self, midi_map_handle):
+        super(BehringerFCB1010, self).build_midi_map(midi_map_handle)
+        # Ask Live to send every message any bank uses to this script, so handle_nonsysex gets them
+        scriptHandle=self._c_instance.handle()
+        for (msgType,channel,identifier) in self._dispatcher.messages() :
+            if msgType==MIDI_NOTE_TYPE :
+                Live.MidiMap.forward_midi_note(scriptHandle, midi_map_handle, channel, identifier)
+            else :
+                Live.MidiMap.forward_midi_cc(scriptHandle, midi_map_handle, channel, identifier)
+
+    def receive_midi(self, midi_bytes):
+        if self._midiTrace is not None : self._midiTrace.record(midi_bytes)
+        super(BehringerFCB1010, self).receive_midi(midi_bytes)
+
+    def handle_nonsysex(self, midi_bytes):
+        # Any gesture deadlines that have passed have to be handled before this message
+        self._scheduler.run_due()
+        if self._debouncer is not None : handled=self._debouncer.receive(midi_bytes)
+        else : handled=self._dispatcher.dispatch(midi_bytes)
+        if not handled :
+            super(BehringerFCB1010, self).handle_nonsysex(midi_bytes)
+
+    def change_bank(self, value, step):
+        """
+        Moves step banks through BANKS, looping around at the ends.
+        """
+        if value<=90 : return # Only do this when the button is pressed (not released)
+        self._dispatcher.select_bank(self._dispatcher.bankIndex+step)
+        self.show_message("FCB1010 bank %d" % self._dispatcher.bankIndex)
+
+    def disconnect(self):
+        if self._gestureTimer is not None :
+            self._gestureTimer.stop()
+        self.dump_handler_stats()
+        if self._debouncer is not None :
+            self._log.info("Debouncing: %s", self._debouncer.summary())
+        if self._midiTrace is not None :
+            self._log.info("MIDI trace: %s", self._midiTrace.summary())
+        self._log.flush()
+        super(BehringerFCB1010, self).disconnect()
+
+    def _instrumented(self, name, handler):
+        """
+        Returns handler wrapped so that its calls are timed if INSTRUMENT_HANDLERS is set,
+        otherwise returns handler itself.
+        """
+        if self._handlerStats is None : return handler
+        return self._handlerStats.wrap(name, handler)
+
+    def dump_handler_stats(self):
+        """
+        Logs the call counts and latencies of every handler, if INSTRUMENT_HANDLERS is set.
+        """
+        if self._handlerStats is None : return
+        self.log_message("Behringer handler timings:")
+        for line in self._handlerStats.summary() :
+            self.log_message("    "+line)
 
     def connect_script_instances(self,instanciated_scripts) :
         """
@@ -128,27 +304,14 @@ class BehringerFCB1010(ControlSurface):
         Used here to get a control surface to piggy back on so that the scene launch
         buttons match the scenes highlighted by the other control surface. 
         """
-        self.log_message("Behringer connect_script_instances with "+str(instanciated_scripts))
+        self._log.debug("connect_script_instances with %s", instanciated_scripts)
         
-        self.scene_offset=None
-        for script in instanciated_scripts:
-            if script==self : continue
-            # See if I can find a SessionComponent and get a reference to
-            # its scene_offset method.
-            try :
-                # This assumes the scene has the attribute name "_session" which may
-                # not be true, but it is for the control surface I'm using.
-                self.scene_offset=script._session.scene_offset
-                self.track_offset=script._session.track_offset
-                self.log_message("Behringer appears to have succesful piggy backed onto "+str(script))
-                break
-            except Exception, error:
-                self.log_message("Behringer couldn't piggy back on "+str(script)+" because:"+str(error))
-
-        if self.scene_offset==None :
-            self.log_message("Behringer couldn't find another control surface to piggy back onto. Scene control will only control the first scenes.")
-            self.scene_offset=lambda : 0
-            self.track_offset=lambda : 0
+        previousHost=self._sessionOffsets.host
+        if self._sessionOffsets.attach(instanciated_scripts, exclude=self) :
+            if self._sessionOffsets.host is not previousHost :
+                self._log.info("has piggy backed onto %s", type(self._sessionOffsets.host).__name__)
+        else :
+            self._log.warning("couldn't find another control surface to piggy back onto. Scene control will only control the first scenes.")
 
     def get_matrix_button(self, column, row):
         return self._matrix_buttons[row][column]
@@ -156,6 +319,17 @@ class BehringerFCB1010(ControlSurface):
     def handle_sysex(self, midi_bytes):
         pass
 
+    def session_state(self):
+        """
+        Returns the up to date SessionStateMirror for the selected scene. If CHECK_SESSION_MIRROR
+        is set, anything that doesn't match Live is logged.
+        """
+        state=self._sessionState.update()
+        if self.CHECK_SESSION_MIRROR :
+            for (field,index,mirrored,liveValue) in state.verify() :
+                self._log.warning("Session mirror mismatch for %s on track %d: mirror=%s Live=%s", field, index, mirrored, liveValue)
+        return state
+
     def begin_recording_handler(self,value):
         """
         Starts recording a clip on any tracks that are armed. If the track is already
@@ -165,16 +339,17 @@ class BehringerFCB1010(ControlSurface):
         # Some controllers send 127 when the button is pressed, my FCB1010 sends 100.
         # I'll just check to see if it's over 90.
         if value>90 : # Only do this when the button is pressed (not released)
-            scene_slots=self.song().view.selected_scene.clip_slots
-            tracks=self.song().tracks
+            state=self.session_state()
+            scene_slots=None # Only fetched if something needs firing
             # I assume the clip slots in a scene always match 1-to-1 with the number of tracks.
             # Start recording in the current scene for every track that is armed. If there is
             # a clip there already ignore that track. If anything is recording already, stop recording.
             # This isn't quite the same as firing the scene, because any clips that aren't playing
             # are left alone.
-            for index in xrange( max( len(scene_slots), len(tracks) ) ) :
-                if tracks[index].arm or tracks[index].implicit_arm :
-                    if (not scene_slots[index].has_clip) or scene_slots[index].is_recording :
+            for index in xrange( len(state) ) :
+                if state.arm[index] or state.implicitArm[index] :
+                    if (not state.hasClip[index]) or state.isRecording[index] :
+                        if scene_slots is None : scene_slots=self.song().view.selected_scene.clip_slots
                         scene_slots[index].fire()
 
     def begin_recording_new_scene_handler(self,value):
@@ -185,36 +360,79 @@ class BehringerFCB1010(ControlSurface):
         # Some controllers send 127 when the button is pressed, my FCB1010 sends 100.
         # I'll just check to see if it's over 90.
         if value>90 : # Only do this when the button is pressed (not released)
-            scene_slots=self.song().view.selected_scene.clip_slots
-            tracks=self.song().tracks
+            state=self.session_state()
             # Make sure there are at least some tracks armed for recording before creating
             # the new scene
             armedTrackIndices=[]
+            armedIndicesWithClips=[]
             clipIndicesToCopy=[]
             clipIndicesToPlay=[]
-            for index in xrange( max( len(scene_slots), len(tracks) ) ) :
-                if tracks[index].arm or tracks[index].implicit_arm :
+            for index in xrange( len(state) ) :
+                if state.arm[index] or state.implicitArm[index] :
                     armedTrackIndices.append(index)
-                elif scene_slots[index].has_clip : # See if there is a clip that needs to be copied
+                    if state.hasClip[index] : armedIndicesWithClips.append(index)
+                elif state.hasClip[index] : # See if there is a clip that needs to be copied
                     clipIndicesToCopy.append(index)
-                    if scene_slots[index].is_playing : clipIndicesToPlay.append(index)
+                    if state.isPlaying[index] : clipIndicesToPlay.append(index)
 
             # If there are no armed tracks then there's no point doing anything
             if len(armedTrackIndices)==0 : return
 
-            # I need to know the index of the current scene. The only way I know to do this is
-            # to loop through all the scenes and see which one matches the current one
-            for sceneIndex in xrange( len(self.song().scenes) ) :
-                if self.song().scenes[sceneIndex]==self.song().view.selected_scene :
-                    break
-            newScene=self.song().create_scene(sceneIndex+1)
+            # Creating the scene, copying the clips and firing everything is one undo step
+            with self._transaction :
+                sceneIndex=self._sceneTracker.index
+                newScene=self._create_scene_with_copies(sceneIndex, clipIndicesToCopy, armedIndicesWithClips)
+                self._fire_new_scene(newScene, clipIndicesToCopy, clipIndicesToPlay, armedTrackIndices)
+
+    def _create_scene_with_copies(self, sceneIndex, clipIndicesToCopy, armedIndicesWithClips):
+        """
+        Creates a new scene after sceneIndex with copies of the clips in clipIndicesToCopy and
+        returns it. If most of the clips in the scene need copying it's quicker to duplicate the
+        whole scene and delete the copies on the armed tracks, otherwise each clip is copied
+        into an empty scene.
+        """
+        song=self.song()
+        if len(armedIndicesWithClips)<len(clipIndicesToCopy) :
+            song.duplicate_scene(sceneIndex)
+            newScene=song.scenes[sceneIndex+1]
+            # The copy gets the scene's name, which Live reads tempo and time signature changes
+            # from (e.g. "120 BPM"), so blank it like a new scene. Versions of Live that have them
+            # as separate scene settings copy those too.
+            newScene.name=''
+            if hasattr(newScene, 'tempo_enabled') : newScene.tempo_enabled=False
+            if hasattr(newScene, 'time_signature_enabled') : newScene.time_signature_enabled=False
             scene_slots=newScene.clip_slots
-            for index in clipIndicesToCopy :
-                tracks[index].duplicate_clip_slot(sceneIndex)
-            for index in clipIndicesToPlay :
-                scene_slots[index].fire()
-            for index in armedTrackIndices :
-                scene_slots[index].fire()
+            for index in armedIndicesWithClips :
+                scene_slots[index].delete_clip()
+            return newScene
+        newScene=song.create_scene(sceneIndex+1)
+        tracks=song.tracks
+        for index in clipIndicesToCopy :
+            tracks[index].duplicate_clip_slot(sceneIndex)
+        return newScene
+
+    def _fire_new_scene(self, newScene, clipIndicesToCopy, clipIndicesToPlay, armedTrackIndices):
+        """
+        Starts the copies of the clips that were playing and starts recording on the armed
+        tracks. Launching the whole scene does the same thing in one go if every copied clip
+        should play and no other track is playing anything, because launching a scene stops
+        whatever is playing on tracks with an empty slot in it.
+        """
+        if self.SCENE_LAUNCH_RECORDS and len(clipIndicesToPlay)==len(clipIndicesToCopy) \
+        and len(clipIndicesToPlay)+len(armedTrackIndices)>1 :
+            involved=set(clipIndicesToCopy)
+            involved.update(armedTrackIndices)
+            tracks=self.song().tracks
+            for index in xrange( len(tracks) ) :
+                if index not in involved and tracks[index].playing_slot_index>=0 : break
+            else :
+                newScene.fire(False, False) # Not legato, and don't let Live move the selection
+                return
+        scene_slots=newScene.clip_slots
+        for index in clipIndicesToPlay :
+            scene_slots[index].fire()
+        for index in armedTrackIndices :
+            scene_slots[index].fire()
 
     def fire_scene(self, value, sceneNumber):
         """
@@ -224,51 +442,72 @@ class BehringerFCB1010(ControlSurface):
         """
         if value>90 : # Only do this when the button is pressed (not released)
             scenes=self.song().scenes
-            index=self.scene_offset()+sceneNumber
+            index=self._sessionOffsets.scene_offset+sceneNumber
             if index<len(scenes) :
                 scenes[index].fire()
 
-    def fire_clip(self, value, clipNumber ):
+    def _pressed_clip_slot(self, clipNumber):
+        """
+        The slot a clip pedal works on at the moment, as (track index, scene index, track, scene),
+        or None if it's off the end of the set. The track and scene are kept so that the slot
+        can be found again if tracks or scenes are inserted or deleted before the action runs.
+        """
+        trackIndex=self._sessionOffsets.track_offset+clipNumber
+        sceneIndex=self._sceneTracker.index
+        tracks=self.song().tracks
+        if trackIndex>=len(tracks) : return None
+        return (trackIndex, sceneIndex, tracks[trackIndex], self.song().view.selected_scene)
+
+    def _clip_slot(self, pressed):
+        """
+        The clip slot for something _pressed_clip_slot returned, wherever its track and scene
+        are now. None if either has been deleted.
+        """
+        if pressed is None : return None
+        (trackIndex,sceneIndex,track,scene)=pressed
+        trackIndex=findIndex(self.song().tracks, track, trackIndex)
+        sceneIndex=findIndex(self.song().scenes, scene, sceneIndex)
+        if trackIndex is None or sceneIndex is None : return None
+        return track.clip_slots[sceneIndex]
+
+    def fire_clip(self, value, clipNumber, pressed=None ):
         """
-        If the button is pressed, starts a timer and deletes the clip when the
-        timer finishes. If the button is released before the timer finishes then
-        it is cancelled and the clip fired.
+        Fires the clip, or stops it if it's already playing. Tapping a clip pedal does this,
+        holding it down calls delete_clip instead.
         I.e. press button once to fire clip, hold to delete current contents.
+        pressed is the slot when the pedal went down (see _pressed_clip_slot), otherwise the
+        slot selected now is used.
         """
-        clipSlots=self.song().view.selected_scene.clip_slots
-        index=self.track_offset()+clipNumber
-        if index>=len(clipSlots) : return
-
-        if value>90 : # button has been pressed
-            self.log_message("index "+str(index))
-            if index<len(clipSlots) : self.log_message("clipSlots[index].has_clip= "+str(clipSlots[index].has_clip))
-            
-            if clipSlots[index].has_clip :
-                self.clipSlotTimers.append( (clipSlots[index],datetime.datetime.now()) )
-        else : # button has been released
-            timerWasRunning=False
-            # Manually search for the clip slot in the list of clipSlotTimers
-            self.log_message("Looking for timer in "+str(self.clipSlotTimers))
-            for (storedClipSlot,storedTimer) in self.clipSlotTimers :
-                if storedClipSlot==clipSlots[index] :
-                    self.log_message("Timer found")
-                    timerWasRunning=True#storedTimer.isAlive()
-                    self.log_message("Tomer was found="+str(timerWasRunning))
-                    self.clipSlotTimers.remove((storedClipSlot,storedTimer))
-                    break
-
-            if timerWasRunning or (not clipSlots[index].has_clip) : # button was released before clip deleted, so fire clip
-                with self.component_guard():
-                    if clipSlots[index].is_recording :
-                        # If recording just play the clip
-                        clipSlots[index].fire() # doesn't seem to be included in "else" for some reason. Maybe is_recording and is_triggered can both be true
-                    elif clipSlots[index].is_playing or clipSlots[index].is_triggered :
-                        clipSlots[index].stop()
-                    else :
-                        clipSlots[index].fire()
+        if value<=90 : return # Only do this when the button is pressed (not released)
+        if pressed is None : pressed=self._pressed_clip_slot(clipNumber)
+        clipSlot=self._clip_slot(pressed)
+        if clipSlot is None : return
+        if self._log.enabled(DEBUG) :
+            self._log.debug("Clip pedal %d on %s, has_clip=%s", clipNumber, clipSlot, clipSlot.has_clip)
+
+        with self.component_guard():
+            if clipSlot.is_recording :
+                # If recording just play the clip
+                clipSlot.fire() # doesn't seem to be included in "else" for some reason. Maybe is_recording and is_triggered can both be true
+            elif clipSlot.is_playing or clipSlot.is_triggered :
+                clipSlot.stop()
+            else :
+                clipSlot.fire()
+
+    def delete_clip(self, value, clipNumber, pressed=None ):
+        """
+        Deletes the clip. Holding a clip pedal down does this, and it deletes the clip in the
+        slot that was selected when the pedal went down (pressed). Returns False if there
+        isn't a clip so that releasing the pedal fires the slot as if it had been tapped.
+        """
+        if value<=90 : return False # Only do this when the button is pressed (not released)
+        if pressed is None : pressed=self._pressed_clip_slot(clipNumber)
+        clipSlot=self._clip_slot(pressed)
+        if clipSlot is None or not clipSlot.has_clip : return False
+        self.deleteClip( clipSlot )
 
     def deleteClip( self, clipSlot ) :
-        self.log_message("Deleting clip number "+str(clipSlot))
+        self._log.info("Deleting clip %s", clipSlot)
         with self.component_guard():
             clipSlot.delete_clip()
                 
@@ -286,99 +525,73 @@ class BehringerFCB1010(ControlSurface):
         Finds tracks that have the same input and output routing.
         """
         if value<=90 : return # Only do this when the button is pressed (not released)
-        # I need to know the index of the current scene. The only way I know to do this is
-        # to loop through all the scenes and see which one matches the current one
-        for sceneIndex in xrange( len(self.song().scenes) ) :
-            if self.song().scenes[sceneIndex]==self.song().view.selected_scene :
-                break
-
-        
+        state=self.session_state()
         allTracks=self.song().tracks
         allClipSlots=self.song().view.selected_scene.clip_slots
         tracksToDuplicate=[] # List of indices of tracks that where there wasn't a match found
-        for trackIndex in xrange( len(allClipSlots) ) :
-            if allTracks[trackIndex].arm==True or allTracks[trackIndex].implicit_arm==True :
+        # Tracks fired during this press. Live might not have reported their new clips yet,
+        # so they mustn't be picked again for another layer.
+        claimed=set()
+        for trackIndex in xrange( len(state) ) :
+            if state.arm[trackIndex] or state.implicitArm[trackIndex] :
                 # Make sure I don't do anything with any tracks that are in the process of
                 # finishing their recording.
-                if self.tracksToDisarm.count( allTracks[trackIndex] )!=0 : continue
+                if len(self.tracksToDisarm)>0 and allTracks[trackIndex] in self.tracksToDisarm : continue
                 # If it's currently recording then I want it to fire and start playing. If it's
                 # empty then I want it to fire and start recording.
-                if not allClipSlots[trackIndex].has_clip :
+                if not state.hasClip[trackIndex] :
                     allClipSlots[trackIndex].fire()
+                    claimed.add(trackIndex)
                     continue # Can just record into here, so no need to find another track
-                if allClipSlots[trackIndex].is_recording :
+                if state.isRecording[trackIndex] :
                     allClipSlots[trackIndex].fire()
-                if allClipSlots[trackIndex].has_clip :
+                if state.hasClip[trackIndex] :
                     # If it previously had a clip, I want to find another track that has the same
                     # input but an empty slot and start recording on that instead. I want it to use
                     # the next available slot to the right; if there isn't one then loop around.
-                    foundMatchingTrack=False
-                    for secondTrackIndex in xrange( trackIndex+1, len(allClipSlots)+trackIndex ) : # start one to the right
-                        if secondTrackIndex>=len(allClipSlots) : secondTrackIndex-=len(allClipSlots) # loop around
-                        
-                        if not allClipSlots[secondTrackIndex].has_clip :
-                            # Check to see if the input is the same
-                            if allTracks[secondTrackIndex].current_input_routing==allTracks[trackIndex].current_input_routing \
-                            and allTracks[secondTrackIndex].current_input_sub_routing==allTracks[trackIndex].current_input_sub_routing :
-                                allTracks[secondTrackIndex].arm=True
-                                allClipSlots[secondTrackIndex].fire()
-                                # Can't unarm this track yet because recording stops immediately.
-                                # Need to add a listener to unarm once the playing status has changed.
-                                self.tracksToDisarm.append( allTracks[trackIndex] )
-                                foundMatchingTrack=True
-                                break
-                    if not foundMatchingTrack :
+                    secondTrackIndex=self._routingIndex.next_empty_track(trackIndex, claimed)
+                    if secondTrackIndex is not None :
+                        claimed.add(secondTrackIndex)
+                        allTracks[secondTrackIndex].arm=True
+                        allClipSlots[secondTrackIndex].fire()
+                        # Can't unarm this track yet because recording stops immediately.
+                        # It gets unarmed once the playing status has changed.
+                        self.tracksToDisarm.add( allTracks[trackIndex], allClipSlots[trackIndex] )
+                    else :
                         # A suitable track wasn't found, so need to create a new one. Can't do this now
                         # though because it would mess up this loop. Record the track index and do it
                         # in a second loop.
                         tracksToDuplicate.append(trackIndex)
         
         # Now I've looped over the pre-existing tracks, I can create any new ones that are
-        # required.
-        offsetFromNewTracks=0 # When I insert a track, the next items in the array will be wrong. Use this to keep track.
-        for sourceIndex in tracksToDuplicate :
-            sourceIndex+=offsetFromNewTracks # Note in python this doesn't affect the next iteration
-            # Can't use duplicate because it doesn't work if the current track is
-            # currently recording. Insert it immediately to the right
-            if allTracks[sourceIndex].has_audio_input :
-                self.song().create_audio_track(sourceIndex+1)
-            else :
-                self.song().create_midi_track(sourceIndex+1)
-            offsetFromNewTracks+=1 # Make sure the next iteration doesn't accidentally address the new track
-            # allTracks and allClipSlots don't appear to update with the new track, so get it again.
-            allTracks=self.song().tracks
-            allClipSlots=self.song().view.selected_scene.clip_slots
-
-            allTracks[sourceIndex+1].current_input_routing=allTracks[sourceIndex].current_input_routing
-            allTracks[sourceIndex+1].current_input_sub_routing=allTracks[sourceIndex].current_input_sub_routing
-            allTracks[sourceIndex+1].arm=True
-            allClipSlots[sourceIndex+1].fire() # Fire the new track
-            # Can't unarm this track yet because recording stops immediately.
-            # Need to delay until the recording has acually stopped. Can't use a listener
-            # because Live complains about making changes during notification. I'll just
-            # add it to a list of things that will be cleared up in a periodically function.
-            self.tracksToDisarm.append( allTracks[sourceIndex] )
+        # required. They're all planned first and then inserted in one go, as one undo step.
+        if len(tracksToDuplicate)>0 :
+            with self._transaction :
+                for (sourceTrack,sourceClipSlot) in TrackInsertPlan(allTracks, tracksToDuplicate).apply(self.song()) :
+                    # Can't unarm this track yet because recording stops immediately.
+                    # Need to delay until the recording has acually stopped. Can't disarm in a listener
+                    # because Live complains about making changes during notification, so it's queued
+                    # up and cleared in update_display, and only watched once the undo step is closed.
+                    self._transaction.defer( partial(self.tracksToDisarm.add, sourceTrack, sourceClipSlot) )
 
     def update_display(self,*a, **k):
         super(BehringerFCB1010, self).update_display(*a, **k)
         
+        # Expression pedals write at most one value each per tick
+        for pedal in self._expressionPedals :
+            pedal.update()
+
         # I can't disarm tracks in listeners so I have to check here to see if anything has
-        # been queued up to be disarmed. 
-        if len(self.tracksToDisarm)>0 :
-            # I need to know the index of the current scene. The only way I know to do this is
-            # to loop through all the scenes and see which one matches the current one
-            for sceneIndex in xrange( len(self.song().scenes) ) :
-                if self.song().scenes[sceneIndex]==self.song().view.selected_scene : break
-
-            for track in self.tracksToDisarm :
-                if not track.clip_slots[sceneIndex].is_recording :
-                    track.arm=False
-                    track.implicit_arm=False
-                    self.tracksToDisarm.remove(track)
-
-        if len(self.clipSlotTimers)>0 :
-            timeNow=datetime.datetime.now()
-            for (clipSlot,timeStarted) in self.clipSlotTimers[:] :
-                if timeNow-timeStarted > self.buttonHoldTime :
-                    clipSlot.delete_clip()
-                    self.clipSlotTimers.remove( (clipSlot,timeStarted) )
+        # finished recording and is ready to be disarmed.
+        if self.tracksToDisarm.has_ready() :
+            self.tracksToDisarm.apply_ready()
+
+        # Gesture deadlines are also checked here in case Live doesn't have a faster timer
+        self._scheduler.run_due()
+
+        # Anything logged since the last tick gets formatted and written out here, away from
+        # the MIDI handlers, and the same goes for the MIDI trace
+        if len(self._log)>0 :
+            self._log.flush()
+        if self._midiTrace is not None :
+            self._midiTrace.flush()
@@ -0,0 +1,57 @@
+import heapq
+
+
+class DeadlineHeap(object):
+    """
+    A min-heap of items ordered by deadline. Cancelling an entry just marks it dead
+    so it gets thrown away when it reaches the top, which means checking for expired
+    items only costs anything for the items that have actually expired.
+    """
+    def __init__(self):
+        self._heap=[]
+        self._counter=0 # Tie breaker so that items themselves never get compared
+        self._live=0
+
+    def __len__(self):
+        return self._live
+
+    def push(self, deadline, item):
+        """
+        Adds an item and returns the entry, which is what gets passed to cancel().
+        """
+        entry=[deadline, self._counter, item, True]
+        self._counter+=1
+        heapq.heappush(self._heap, entry)
+        self._live+=1
+        return entry
+
+    def cancel(self, entry):
+        if entry[3] :
+            entry[3]=False
+            self._live-=1
+
+    def next_deadline(self):
+        """
+        The earliest deadline still pending, or None if there isn't one.
+        """
+        self._discard_cancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now):
+        """
+        Removes and returns, earliest first, the items whose deadline is at or before now.
+        """
+        expired=[]
+        heap=self._heap
+        while heap and heap[0][0]<=now :
+            entry=heapq.heappop(heap)
+            if entry[3] :
+                entry[3]=False
+                self._live-=1
+                expired.append(entry[2])
+        return expired
+
+    def _discard_cancelled(self):
+        heap=self._heap
+        while heap and not heap[0][3] :
+            heapq.heappop(heap)
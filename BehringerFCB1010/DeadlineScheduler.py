@@ -0,0 +1,31 @@
+import time
+from DeadlineHeap import DeadlineHeap
+
+
+class DeadlineScheduler(object):
+    """
+    Calls functions once their deadline has passed. run_due() is cheap when nothing is due,
+    so it can be called from anywhere the script gets control: every incoming MIDI message,
+    every display tick and, where Live provides one, a fast timer. clock can be replaced,
+    e.g. to replay recorded MIDI faster than real time.
+    """
+    def __init__(self, clock=time.time):
+        self.clock=clock
+        self._deadlines=DeadlineHeap()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, delay, callback):
+        """
+        Calls callback after delay seconds. Returns a token that can be passed to cancel().
+        """
+        return self._deadlines.push(self.clock()+delay, callback)
+
+    def cancel(self, token):
+        self._deadlines.cancel(token)
+
+    def run_due(self):
+        if len(self._deadlines)==0 : return
+        for callback in self._deadlines.pop_expired( self.clock() ) :
+            callback()
@@ -0,0 +1,67 @@
+from functools import partial
+
+
+class DisarmQueue(object):
+    """
+    Tracks waiting to be disarmed once the clip they were recording has actually stopped
+    recording. Disarming straight away stops the recording immediately, and Live complains
+    about making changes during a notification, so the playing_status listener only marks
+    the track as ready. apply_ready() does the disarming in one batch and is called from
+    update_display, which costs nothing when nothing is ready.
+    """
+    def __init__(self):
+        self._pending=[] # Entries are [track, clipSlot, listener]
+        self._ready=[]
+
+    def disconnect(self):
+        for entry in self._pending :
+            self._remove_listener(entry)
+        self._pending=[]
+        self._ready=[]
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, track):
+        for entry in self._pending :
+            if entry[0]==track : return True
+        return False
+
+    def add(self, track, clipSlot):
+        """
+        Disarms the track once clipSlot is no longer recording.
+        """
+        entry=[track, clipSlot, None]
+        self._pending.append(entry)
+        if clipSlot.is_recording :
+            entry[2]=partial(self._on_playing_status_changed, entry)
+            clipSlot.add_playing_status_listener(entry[2])
+        else :
+            self._ready.append(entry)
+
+    def has_ready(self):
+        return len(self._ready)>0
+
+    def apply_ready(self):
+        """
+        Disarms every track whose recording has finished. Must not be called from inside
+        a Live notification.
+        """
+        ready=self._ready
+        self._ready=[]
+        for entry in ready :
+            self._remove_listener(entry)
+            self._pending.remove(entry)
+            entry[0].arm=False
+            entry[0].implicit_arm=False
+
+    def _on_playing_status_changed(self, entry):
+        if entry[2] is None or entry[1].is_recording : return
+        self._ready.append(entry)
+
+    def _remove_listener(self, entry):
+        listener=entry[2]
+        if listener is None : return
+        entry[2]=None
+        if entry[1].playing_status_has_listener(listener) :
+            entry[1].remove_playing_status_listener(listener)
@@ -0,0 +1,84 @@
+from __future__ import division
+import math
+
+
+def _curve_table(function):
+    return tuple( function(value/127) for value in xrange(128) )
+
+# Response curves, precomputed for every CC value. Each maps the pedal position (0 to 127)
+# to how far along the parameter's range it should be (0.0 to 1.0).
+CURVES = { 'linear' : _curve_table( lambda x : x ),
+           'exponential' : _curve_table( lambda x : x*x ),
+           'logarithmic' : _curve_table( lambda x : math.sqrt(x) ),
+           's_curve' : _curve_table( lambda x : x*x*(3-2*x) ) }
+
+
+class ExpressionPedal(object):
+    """
+    Turns the stream of CC values from an expression pedal into writes to a Live parameter.
+    Incoming values only update the position the pedal is heading for, ignoring changes
+    smaller than deadband (so the one step jitter of a pedal resting between two values is
+    dropped), and the high-rate CC stream costs almost nothing. update(), called once per
+    display tick, moves the smoothed position part of the way (response) towards that, looks
+    it up in the response curve and writes at most one value to the parameter. The value
+    isn't read back from Live, it's compared with the last value written.
+
+    The target is one of
+        ('volume',)          the selected track's volume
+        ('send', index)      one of the selected track's sends
+        ('device', index)    a parameter of the selected track's selected device
+    """
+    def __init__(self, song, target, curve='linear', response=0.7, deadband=2):
+        self._song=song
+        self._target=target
+        self._curve=CURVES[curve]
+        self._response=response
+        self._deadband=deadband
+        self._position=None # Where the pedal is, from the last accepted CC value
+        self._smoothed=None # The smoothed position last written
+        self._isSettled=True
+        self._lastParameter=None # The parameter and value last written
+        self._lastValue=None
+
+    def receive_value(self, value):
+        if self._position is not None and abs(value-self._position)<self._deadband and value not in (0,127) :
+            return
+        self._position=value
+        self._isSettled=False
+
+    def update(self):
+        """
+        Writes the parameter if the pedal has moved. Must not be called from a Live notification.
+        """
+        if self._isSettled : return
+        if self._smoothed is None or abs(self._position-self._smoothed)<0.5 :
+            self._smoothed=self._position
+            self._isSettled=True
+        else :
+            self._smoothed+=self._response*(self._position-self._smoothed)
+        parameter=self.parameter()
+        if parameter is None : return
+        minimum=parameter.min
+        value=minimum+self._curve[ int(round(self._smoothed)) ]*(parameter.max-minimum)
+        if parameter==self._lastParameter and value==self._lastValue : return
+        parameter.value=value
+        self._lastParameter=parameter
+        self._lastValue=value
+
+    def parameter(self):
+        """
+        The Live parameter the pedal currently controls, or None if there isn't one.
+        """
+        track=self._song.view.selected_track
+        if track is None : return None
+        if self._target[0]=='volume' :
+            return track.mixer_device.volume
+        if self._target[0]=='send' :
+            sends=track.mixer_device.sends
+            return sends[self._target[1]] if self._target[1]<len(sends) else None
+        if self._target[0]=='device' :
+            device=track.view.selected_device
+            if device is None : return None
+            parameters=device.parameters
+            return parameters[self._target[1]] if self._target[1]<len(parameters) else None
+        return None
@@ -0,0 +1,67 @@
+from array import array
+from timeit import default_timer
+
+
+class HandlerStats(object):
+    """
+    Call counts and latency histograms for MIDI handlers. Each histogram has a fixed
+    number of buckets, bucket i counting calls that took between 2**(i-1) and 2**i
+    microseconds, so the memory used doesn't grow however long Live runs for.
+    """
+    NUMBER_OF_BUCKETS = 25 # The last bucket collects anything over about 8 seconds
+
+    def __init__(self):
+        self._histograms={} # Key is the handler name, value is a HandlerHistogram
+
+    def wrap(self, name, function):
+        """
+        Returns a function that calls function and records how long it took under name.
+        """
+        histogram=self._histograms.setdefault(name, HandlerHistogram(self.NUMBER_OF_BUCKETS))
+        def timedFunction(*a, **k):
+            start=default_timer()
+            try :
+                return function(*a, **k)
+            finally :
+                histogram.add( default_timer()-start )
+        return timedFunction
+
+    def summary(self):
+        """
+        One line per handler that has been called, slowest total time first.
+        """
+        lines=[]
+        histograms=sorted(self._histograms.iteritems(), key=lambda item : -item[1].total)
+        for (name,histogram) in histograms :
+            if histogram.count==0 : continue
+            lines.append( "%s: calls=%d total=%.1fms mean=%.3fms p50<%.3fms p90<%.3fms p99<%.3fms max=%.3fms" % (name,
+                histogram.count, 1000*histogram.total, 1000*histogram.total/histogram.count,
+                1000*histogram.percentile(0.5), 1000*histogram.percentile(0.9), 1000*histogram.percentile(0.99),
+                1000*histogram.maximum) )
+        return lines
+
+
+class HandlerHistogram(object):
+    def __init__(self, numberOfBuckets):
+        self.buckets=array('L', [0]*numberOfBuckets)
+        self.count=0
+        self.total=0.0
+        self.maximum=0.0
+
+    def add(self, seconds):
+        bucket=min( int(seconds*1000000).bit_length(), len(self.buckets)-1 )
+        self.buckets[bucket]+=1
+        self.count+=1
+        self.total+=seconds
+        if seconds>self.maximum : self.maximum=seconds
+
+    def percentile(self, fraction):
+        """
+        The upper edge, in seconds, of the bucket the given fraction of calls fall within.
+        """
+        threshold=fraction*self.count
+        cumulative=0
+        for bucket in xrange( len(self.buckets) ) :
+            cumulative+=self.buckets[bucket]
+            if cumulative>=threshold : return min( (2**bucket)/1000000.0, self.maximum )
+        return self.maximum
@@ -0,0 +1,90 @@
+from bisect import bisect_left, bisect_right, insort
+from functools import partial
+from ListenerGroup import ListenerGroup
+
+
+class InputRoutingIndex(object):
+    """
+    For each (input routing, input sub-routing) pair, keeps the sorted list of indices
+    of tracks that have an empty clip slot in the selected scene. That makes finding
+    "the next free track to the right with the same input" a binary search rather than
+    a walk over every track asking Live for its routing.
+    Routing and has_clip listeners keep it up to date. If the tracks or the selected
+    scene change it is rebuilt the next time it's used.
+    """
+    def __init__(self, song):
+        self._song=song
+        self._routingKeys=[] # The (routing, sub-routing) of each track
+        self._isEmpty=[] # Whether each track's slot in the selected scene is in the index
+        self._emptyTracks={} # Key is (routing, sub-routing), value is a sorted list of track indices
+        self._dirty=True
+        self._trackListeners=ListenerGroup()
+        self._song.add_tracks_listener(self._on_layout_changed)
+        self._song.view.add_selected_scene_listener(self._on_layout_changed)
+
+    def disconnect(self):
+        self._trackListeners.remove_all()
+        if self._song.tracks_has_listener(self._on_layout_changed) :
+            self._song.remove_tracks_listener(self._on_layout_changed)
+        if self._song.view.selected_scene_has_listener(self._on_layout_changed) :
+            self._song.view.remove_selected_scene_listener(self._on_layout_changed)
+
+    def next_empty_track(self, trackIndex, exclude=()):
+        """
+        Returns the index of the first track to the right of trackIndex, looping around
+        at the end, that has the same input as trackIndex and an empty slot in the selected
+        scene. Tracks in exclude are skipped, e.g. ones already used earlier in the same press
+        whose new clip Live hasn't reported yet. Returns None if there isn't one.
+        """
+        self._rebuild_if_needed()
+        candidates=self._emptyTracks.get( self._routingKeys[trackIndex] )
+        if not candidates : return None
+        position=bisect_right(candidates, trackIndex)
+        for offset in xrange( len(candidates) ) :
+            candidate=candidates[ (position+offset)%len(candidates) ]
+            if candidate!=trackIndex and candidate not in exclude : return candidate
+        return None
+
+    def _on_layout_changed(self):
+        self._dirty=True
+
+    def _rebuild_if_needed(self):
+        if not self._dirty : return
+        self._dirty=False
+        self._trackListeners.remove_all()
+        tracks=self._song.tracks
+        clipSlots=self._song.view.selected_scene.clip_slots
+        self._routingKeys=[None]*len(tracks)
+        self._isEmpty=[False]*len(tracks)
+        self._emptyTracks={}
+        for index in xrange( len(tracks) ) :
+            track=tracks[index]
+            self._routingKeys[index]=(track.current_input_routing, track.current_input_sub_routing)
+            self._set_empty(index, not clipSlots[index].has_clip)
+            onRoutingChanged=partial(self._on_routing_changed, index)
+            self._trackListeners.add(track, 'current_input_routing', onRoutingChanged)
+            self._trackListeners.add(track, 'current_input_sub_routing', onRoutingChanged)
+            self._trackListeners.add(clipSlots[index], 'has_clip', partial(self._on_has_clip_changed, index))
+
+    def _on_routing_changed(self, trackIndex):
+        if self._dirty : return
+        track=self._song.tracks[trackIndex]
+        wasEmpty=self._isEmpty[trackIndex]
+        self._set_empty(trackIndex, False)
+        self._routingKeys[trackIndex]=(track.current_input_routing, track.current_input_sub_routing)
+        self._set_empty(trackIndex, wasEmpty)
+
+    def _on_has_clip_changed(self, trackIndex):
+        if self._dirty : return
+        self._set_empty(trackIndex, not self._song.view.selected_scene.clip_slots[trackIndex].has_clip)
+
+    def _set_empty(self, trackIndex, isEmpty):
+        if self._isEmpty[trackIndex]==isEmpty : return
+        self._isEmpty[trackIndex]=isEmpty
+        key=self._routingKeys[trackIndex]
+        if isEmpty :
+            insort(self._emptyTracks.setdefault(key, []), trackIndex)
+        else :
+            candidates=self._emptyTracks[key]
+            del candidates[ bisect_left(candidates, trackIndex) ]
+            if not candidates : del self._emptyTracks[key]
@@ -0,0 +1,19 @@
+class ListenerGroup(object):
+    """
+    Remembers Live listeners as they're added so that they can all be removed in one go,
+    e.g. when the tracks they were added to have changed and need listening to again.
+    The name is the property name Live uses, so add(track,'arm',f) calls
+    track.add_arm_listener(f).
+    """
+    def __init__(self):
+        self._listeners=[]
+
+    def add(self, subject, name, callback):
+        getattr(subject, 'add_'+name+'_listener')(callback)
+        self._listeners.append( (subject,name,callback) )
+
+    def remove_all(self):
+        for (subject,name,callback) in self._listeners :
+            if getattr(subject, name+'_has_listener')(callback) :
+                getattr(subject, 'remove_'+name+'_listener')(callback)
+        self._listeners=[]
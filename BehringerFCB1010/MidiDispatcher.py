@@ -0,0 +1,60 @@
+from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_CC_TYPE
+
+# Status byte (with the channel masked off) to the _Framework message type
+_STATUS_TYPES = { 0x80 : MIDI_NOTE_TYPE, 0x90 : MIDI_NOTE_TYPE, 0xB0 : MIDI_CC_TYPE }
+
+
+class MidiDispatcher(object):
+    """
+    Looks up incoming MIDI messages by (msg_type, channel, identifier) and calls whatever
+    is registered for them with the message value. Each bank is a dict built once at
+    startup, and changing bank just changes which dict is looked in, so having lots of
+    banks costs nothing when a pedal is pressed. Actions in alwaysActive (e.g. the bank
+    up and down pedals) work whichever bank is selected.
+    """
+    def __init__(self, banks, alwaysActive={}):
+        self._banks=banks
+        self._alwaysActive=alwaysActive
+        self.bankIndex=0
+        self._activeBank=banks[0]
+
+    def __len__(self):
+        return len(self._banks)
+
+    def messages(self):
+        """
+        Every (msg_type, channel, identifier) any bank responds to, so that they can all be
+        forwarded to the script.
+        """
+        messages=set(self._alwaysActive)
+        for bank in self._banks :
+            messages.update(bank)
+        return messages
+
+    def select_bank(self, index):
+        self.bankIndex=index%len(self._banks)
+        self._activeBank=self._banks[self.bankIndex]
+
+    def handles(self, midi_bytes):
+        """
+        Whether dispatch() would call an action for the message in the current bank.
+        """
+        msgType=_STATUS_TYPES.get(midi_bytes[0]&0xF0)
+        if msgType is None : return False
+        key=(msgType, midi_bytes[0]&0x0F, midi_bytes[1])
+        return key in self._activeBank or key in self._alwaysActive
+
+    def dispatch(self, midi_bytes):
+        """
+        Calls the action for the message. Returns False if there isn't one.
+        """
+        msgType=_STATUS_TYPES.get(midi_bytes[0]&0xF0)
+        if msgType is None : return False
+        key=(msgType, midi_bytes[0]&0x0F, midi_bytes[1])
+        action=self._activeBank.get(key)
+        if action is None :
+            action=self._alwaysActive.get(key)
+            if action is None : return False
+        # Note off messages count as a value of zero, the same as a note on with no velocity
+        action( midi_bytes[2] if midi_bytes[0]&0xF0!=0x80 else 0 )
+        return True
@@ -0,0 +1,80 @@
+from functools import partial
+
+
+class PedalDebouncer(object):
+    """
+    Sits in front of the MIDI dispatcher and cleans up the note messages from the pedals.
+    Foot switches bounce, pedals get double stomped and the FCB1010 sometimes sends a note-on
+    again without a note-off in between, each of which would otherwise run a handler again.
+        - A message that doesn't change whether the pedal is down (a repeated note-on, or a
+          note-off when it's already up) is dropped.
+        - After a pedal goes down or up, further changes within window seconds are held back.
+          When the window is up, if the pedal has ended up in a different state from the one
+          passed on then that last message is passed on, with a new window that started when
+          the pedal got to that state.
+    So a bounce or a double stomp reaches the handlers as a single press, and a hold that
+    bounced on the way down is still a hold. deliver is called with every message that's
+    passed on and should return whether it was handled, like MidiDispatcher.dispatch. Only
+    notes that accepts (e.g. MidiDispatcher.handles) returns True for are debounced, anything
+    else, e.g. the expression pedals or notes the current bank doesn't use, goes straight
+    through. A message that's passed on late and isn't handled, e.g. because the bank was
+    changed while it was held back, is given to unhandled if there is one.
+    """
+    def __init__(self, scheduler, deliver, window=0.05, accepts=None, unhandled=None):
+        self._scheduler=scheduler
+        self._deliver=deliver
+        self._accepts=accepts
+        self._unhandled=unhandled
+        self.window=window
+        self._pedals={} # Keyed by (channel, note), entries are [isDown, rawIsDown, rawBytes, timer, rawTime]
+        self.filtered={ 'repeated' : 0, 'bounced' : 0 }
+
+    def receive(self, midi_bytes):
+        """
+        Passes midi_bytes on, or drops it. Returns True if it was dropped or handled.
+        """
+        status=midi_bytes[0]&0xF0
+        if status!=0x90 and status!=0x80 : return self._deliver(midi_bytes)
+        # Same threshold as the handlers, anything else counts as the pedal being up
+        isDown=(status==0x90 and midi_bytes[2]>90)
+        key=(midi_bytes[0]&0x0F, midi_bytes[1])
+        pedal=self._pedals.get(key)
+        if self._accepts is not None and not self._accepts(midi_bytes) :
+            # Still keep track of the pedal, so that it isn't out of date if the bank changes back
+            if pedal is not None :
+                pedal[0]=pedal[1]=isDown
+                pedal[2]=None
+            return self._deliver(midi_bytes)
+        if pedal is None :
+            pedal=[False, False, None, None, None]
+            self._pedals[key]=pedal
+        if pedal[3] is not None :
+            # Still settling after the last change, so just remember where it's got to
+            self.filtered['repeated' if isDown==pedal[1] else 'bounced']+=1
+            if isDown!=pedal[1] : pedal[4]=self._scheduler.clock()
+            pedal[1]=isDown
+            pedal[2]=midi_bytes
+            return True
+        if isDown==pedal[0] :
+            self.filtered['repeated']+=1
+            return True
+        self._accept(key, pedal, isDown, self.window)
+        return self._deliver(midi_bytes)
+
+    def summary(self):
+        return "%d repeated and %d bounced pedal messages filtered with a %.0fms window" % (self.filtered['repeated'], self.filtered['bounced'], 1000*self.window)
+
+    def _accept(self, key, pedal, isDown, window):
+        pedal[0]=pedal[1]=isDown
+        pedal[2]=None
+        pedal[3]=self._scheduler.schedule(window, partial(self._on_settled, key)) if window>0 else None
+
+    def _on_settled(self, key):
+        pedal=self._pedals[key]
+        pedal[3]=None
+        if pedal[1]!=pedal[0] :
+            midi_bytes=pedal[2]
+            # The window for this change started when it arrived, not now. Otherwise if the
+            # deadline is checked late the next real change could be taken for a bounce.
+            self._accept(key, pedal, pedal[1], pedal[4]+self.window-self._scheduler.clock())
+            if not self._deliver(midi_bytes) and self._unhandled is not None : self._unhandled(midi_bytes)
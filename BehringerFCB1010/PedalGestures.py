@@ -0,0 +1,91 @@
+GESTURES = ('press', 'tap', 'double_tap', 'hold', 'long_press')
+
+
+class PedalGestures(object):
+    """
+    Recognises gestures on one pedal and calls the action bound to each. Every action is
+    called with the value of the press that started the gesture.
+        press        as soon as the pedal goes down
+        tap          released before hold_time. If double_tap is also bound this waits for
+                     double_tap_time after the release in case a second press follows.
+        double_tap   pressed again within double_tap_time of a tap
+        hold         still down after hold_time
+        long_press   still down after long_press_time
+    If capture is given it's called when the gesture starts, and whatever it returns is passed
+    to every action as the keyword argument pressed. That lets an action that happens later,
+    e.g. on hold, work on what was selected when the pedal went down.
+    Timing is done with a DeadlineScheduler, so each MIDI message costs a constant amount of
+    work however many pedals there are. If the hold action returns False (meaning there was
+    nothing to do) the release still counts as a tap.
+    """
+    def __init__(self, scheduler, actions, hold_time=2.0, long_press_time=4.0, double_tap_time=0.3, capture=None):
+        for gesture in actions :
+            if gesture not in GESTURES : raise ValueError("Unknown pedal gesture '%s'" % gesture)
+        self._scheduler=scheduler
+        self._actions=actions
+        self._capture=capture
+        self._captured=None
+        self.hold_time=hold_time
+        self.long_press_time=long_press_time
+        self.double_tap_time=double_tap_time
+        self._isDown=False
+        self._pressValue=0
+        self._held=False # Whether hold or long_press has happened during this press
+        self._isSecondPress=False
+        self._timers=[]
+        self._tapTimer=None
+
+    def receive_value(self, value):
+        # Some controllers send 127 when the button is pressed, my FCB1010 sends 100.
+        # I'll just check to see if it's over 90.
+        if value>90 :
+            if not self._isDown : self._pressed(value)
+        elif self._isDown :
+            self._released()
+
+    def _pressed(self, value):
+        self._isDown=True
+        self._held=False
+        if self._tapTimer is not None :
+            # Second press soon after a tap
+            self._scheduler.cancel(self._tapTimer)
+            self._tapTimer=None
+            self._isSecondPress=True
+            self._call('double_tap')
+            return
+        self._isSecondPress=False
+        self._pressValue=value
+        if self._capture is not None : self._captured=self._capture()
+        self._call('press')
+        if 'hold' in self._actions :
+            self._timers.append( self._scheduler.schedule(self.hold_time, self._on_hold) )
+        if 'long_press' in self._actions :
+            self._timers.append( self._scheduler.schedule(self.long_press_time, self._on_long_press) )
+
+    def _released(self):
+        self._isDown=False
+        for timer in self._timers :
+            self._scheduler.cancel(timer)
+        self._timers=[]
+        if self._held or self._isSecondPress : return
+        if 'double_tap' in self._actions :
+            self._tapTimer=self._scheduler.schedule(self.double_tap_time, self._on_tap_timeout)
+        else :
+            self._call('tap')
+
+    def _on_hold(self):
+        if self._call('hold') is not False : self._held=True
+
+    def _on_long_press(self):
+        self._held=True
+        self._call('long_press')
+
+    def _on_tap_timeout(self):
+        self._tapTimer=None
+        self._call('tap')
+
+    def _call(self, gesture):
+        action=self._actions.get(gesture)
+        if action is None : return None
+        if self._capture is None : return action(self._pressValue)
+        return action(self._pressValue, pressed=self._captured)
@@ -0,0 +1,122 @@
+from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_CC_TYPE
+from _Mapping.MappingFile import MappingError, midi_messages, check_overlaps, require
+from PedalGestures import GESTURES
+from ExpressionPedal import CURVES
+
+# Change this whenever compile_mapping changes what it returns, so that cached mappings
+# compiled by the old version aren't used.
+MAPPING_VERSION = 1
+
+# The pedal actions a bank can bind, and the attribute of BehringerFCB1010 that gets the
+# MIDI messages for the pedal group bound to each in the first bank.
+ACTIONS = { 'begin_recording' : 'BEGIN_RECORDING_MIDI_NOTES',
+            'begin_new_scene' : 'BEGIN_NEW_SCENE_MIDI_NOTES',
+            'begin_new_layer' : 'BEGIN_NEW_LAYER_MIDI_NOTES',
+            'stop_song' : 'STOP_SONG_MIDI_NOTES',
+            'toggle_metronome' : 'TOGGLE_METRONOME_MIDI_NOTES',
+            'fire_scene' : 'FIRE_SCENE_MIDI_NOTES',
+            'fire_clip' : 'FIRE_CLIP_MIDI_NOTES',
+            'delete_clip' : None } # shares the fire_clip pedals, so has no attribute of its own
+# Pedal groups that work the same in every bank, and the attribute each is stored in
+BANK_PEDALS = { 'bank_up' : 'BANK_UP_MIDI_NOTES',
+                'bank_down' : 'BANK_DOWN_MIDI_NOTES' }
+EXPRESSION_TARGETS = { 'volume' : 0, 'send' : 1, 'device' : 1 } # and the number of arguments each takes
+
+# The gesture each action is bound to unless the bank says otherwise. See PedalGestures.
+DEFAULT_GESTURES = { 'fire_clip' : 'tap', 'delete_clip' : 'hold' }
+
+def pedal_bank(numberOffset=0, gestures={}, **actionMessages):
+    """
+    Turns lists of MIDI messages for each action name into a list of (message, action, argument,
+    gesture) entries for BehringerFCB1010.BANKS. For fire_scene, fire_clip and delete_clip the
+    argument is the position in the list plus numberOffset, i.e. which scene or clip in the
+    highlighted region the pedal works on. The other actions don't take an argument.
+    gestures maps action names to the gesture that triggers them, otherwise DEFAULT_GESTURES
+    is used and then 'press'.
+    """
+    entries=[]
+    for (action,messages) in actionMessages.iteritems() :
+        gesture=gestures.get(action, DEFAULT_GESTURES.get(action, 'press'))
+        for index in xrange( len(messages) ) :
+            argument=index+numberOffset if action in ('fire_scene','fire_clip','delete_clip') else None
+            entries.append( (messages[index], action, argument, gesture) )
+    return entries
+
+def compile_mapping(source):
+    """
+    Checks a parsed FCB1010 mapping file and returns a dictionary of the BehringerFCB1010
+    attributes it sets: MIDI_CHANNEL, the *_MIDI_NOTES lists, BANKS and the EXPRESSION_* lists. The file
+    looks like
+        { "channel" : 0,
+          "pedals" : { "begin_recording" : [1, 11], "fire_clip" : [16, 17, 18, 19, 20],
+                       "bank_up" : [21], "bank_down" : [22], ... },
+          "expression" : [ { "cc" : 27, "target" : ["volume"], "curve" : "linear" }, ... ],
+          "banks" : [ { "offset" : 0,
+                        "actions" : { "fire_clip" : "fire_clip", "delete_clip" : "fire_clip", ... },
+                        "gestures" : { "fire_clip" : "double_tap" } }, ... ] }
+    "pedals" gives the notes each group of pedals sends, and each bank binds actions to those
+    groups. A pedal can only belong to one group, and within a bank a pedal can only have one
+    action per gesture.
+    """
+    channel=require(source, 'channel', 'mapping')
+    pedals={}
+    for (name,notes) in require(source, 'pedals', 'mapping').iteritems() :
+        pedals[str(name)]=midi_messages(MIDI_NOTE_TYPE, channel, notes, "pedal group '%s'" % name)
+
+    expressionMidiCC=[]
+    expressionTargets=[]
+    expressionCurves=[]
+    controls=dict(pedals)
+    for (index,pedal) in enumerate( require(source, 'expression', 'mapping') ) :
+        where="expression pedal %d" % (index+1)
+        controls[where]=midi_messages(MIDI_CC_TYPE, channel, [require(pedal, 'cc', where)], where)
+        target=require(pedal, 'target', where)
+        if not isinstance(target, list) or len(target)==0 or target[0] not in EXPRESSION_TARGETS or len(target)!=1+EXPRESSION_TARGETS[target[0]] :
+            raise MappingError("%s: unknown target %r" % (where,target))
+        curve=pedal.get('curve', 'linear')
+        if curve not in CURVES :
+            raise MappingError("%s: unknown curve '%s', should be one of %s" % (where,curve,", ".join(sorted(CURVES))))
+        expressionMidiCC.append(pedal['cc'])
+        expressionTargets.append( (str(target[0]),)+tuple(target[1:]) )
+        expressionCurves.append( str(curve) )
+    check_overlaps(controls)
+
+    attributes={ 'MIDI_CHANNEL' : channel,
+                 'EXPRESSION_MIDI_CC' : expressionMidiCC,
+                 'EXPRESSION_TARGETS' : expressionTargets,
+                 'EXPRESSION_CURVES' : expressionCurves }
+    for (group,attribute) in BANK_PEDALS.iteritems() :
+        attributes[attribute]=pedals.pop(group, [])
+
+    banks=[]
+    for (index,bank) in enumerate( require(source, 'banks', 'mapping') ) :
+        where="bank %d" % index
+        actionMessages={}
+        for (action,group) in require(bank, 'actions', where).iteritems() :
+            if action not in ACTIONS :
+                raise MappingError("%s: unknown action '%s', should be one of %s" % (where,action,", ".join(sorted(ACTIONS))))
+            if group not in pedals :
+                raise MappingError("%s: action '%s' uses pedal group '%s' which isn't in 'pedals'" % (where,action,group))
+            actionMessages[str(action)]=pedals[group]
+            # The first bank says which notes the script's attributes for each action hold
+            if index==0 and ACTIONS[action] is not None : attributes[ACTIONS[action]]=pedals[group]
+        gestures=dict( (str(action),str(gesture)) for (action,gesture) in bank.get('gestures', {}).iteritems() )
+        for (action,gesture) in gestures.iteritems() :
+            if gesture not in GESTURES :
+                raise MappingError("%s: unknown gesture '%s' for '%s', should be one of %s" % (where,gesture,action,", ".join(GESTURES)))
+        offset=bank.get('offset', 0)
+        if not isinstance(offset, int) or offset<0 :
+            raise MappingError("%s: offset must be a whole number of scenes and clips, not %r" % (where,offset))
+        entries=pedal_bank(offset, gestures, **actionMessages)
+        # Two actions can share a pedal as long as they're triggered by different gestures
+        bound={}
+        for (message,action,argument,gesture) in entries :
+            if (message,gesture) in bound :
+                raise MappingError("%s: note %d is bound to both '%s' and '%s' on %s" % (where,message[2],bound[(message,gesture)],action,gesture))
+            bound[(message,gesture)]=action
+        banks.append(entries)
+    if len(banks)==0 : raise MappingError("mapping: there must be at least one bank")
+    attributes['BANKS']=banks
+    for attribute in ACTIONS.itervalues() :
+        if attribute is not None : attributes.setdefault(attribute, [])
+    return attributes
@@ -0,0 +1,48 @@
+class SceneIndexTracker(object):
+    """
+    Keeps track of the index of the selected scene so that the pedal handlers don't
+    have to loop over every scene comparing it to the selected one. The index is only
+    worked out again after Live tells me the selection or the scene list has changed,
+    and even then I try the scenes next to the last known index first because moving
+    the selection up or down by one is by far the most common change.
+    """
+    def __init__(self, song):
+        self._song=song
+        self._index=None # None means it needs to be worked out again
+        self._lastIndex=0 # Where to start looking when it does need working out
+        self._song.view.add_selected_scene_listener(self._on_selection_changed)
+        self._song.add_scenes_listener(self._on_scenes_changed)
+
+    def disconnect(self):
+        if self._song.view.selected_scene_has_listener(self._on_selection_changed) :
+            self._song.view.remove_selected_scene_listener(self._on_selection_changed)
+        if self._song.scenes_has_listener(self._on_scenes_changed) :
+            self._song.remove_scenes_listener(self._on_scenes_changed)
+
+    @property
+    def index(self):
+        """
+        The index of the selected scene in song.scenes.
+        """
+        if self._index is None :
+            self._index=self._find_index()
+            self._lastIndex=self._index
+        return self._index
+
+    def _on_selection_changed(self):
+        self._index=None
+
+    def _on_scenes_changed(self):
+        self._index=None
+
+    def _find_index(self):
+        scenes=self._song.scenes
+        selectedScene=self._song.view.selected_scene
+        # Try the last known index and its neighbours before falling back to a full search
+        for index in (self._lastIndex, self._lastIndex+1, self._lastIndex-1) :
+            if 0<=index<len(scenes) and scenes[index]==selectedScene :
+                return index
+        for index in xrange( len(scenes) ) :
+            if scenes[index]==selectedScene :
+                return index
+        return 0
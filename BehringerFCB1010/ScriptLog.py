@@ -0,0 +1,75 @@
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVEL_NAMES = { DEBUG : 'DEBUG', INFO : 'INFO', WARNING : 'WARNING' }
+
+
+class ScriptLog(object):
+    """
+    Leveled logging that keeps formatting out of the MIDI handlers. Each call only stores the
+    format string and its arguments in a bounded ring buffer; the message is formatted and
+    written when flush() is called, which the script does from update_display. If the buffer
+    fills up before a flush the oldest records are dropped and the number dropped is logged.
+    The methods for disabled levels are replaced with one that does nothing, so a disabled
+    debug() call costs no more than calling an empty function.
+        log=ScriptLog(self.log_message, level=INFO)
+        log.debug("Firing clip %d on track %d", clipNumber, trackIndex)
+    """
+    def __init__(self, write, level=INFO, capacity=256, prefix=""):
+        self._write=write
+        self._records=deque(maxlen=capacity)
+        self._dropped=0
+        self.prefix=prefix
+        self.set_level(level)
+
+    def __len__(self):
+        return len(self._records)
+
+    def set_level(self, level):
+        self.level=level
+        for (method,methodLevel) in (('debug',DEBUG), ('info',INFO), ('warning',WARNING)) :
+            if methodLevel>=level :
+                setattr(self, method, getattr(self, '_'+method))
+            else :
+                setattr(self, method, self._discard)
+
+    def enabled(self, level):
+        """
+        For callers that need to do some work to get the arguments, which would otherwise
+        happen even when the level is disabled.
+        """
+        return level>=self.level
+
+    def _debug(self, message, *args):
+        self._append( (DEBUG, message, args) )
+
+    def _info(self, message, *args):
+        self._append( (INFO, message, args) )
+
+    def _warning(self, message, *args):
+        self._append( (WARNING, message, args) )
+
+    def _discard(self, message, *args):
+        pass
+
+    def _append(self, record):
+        if len(self._records)==self._records.maxlen : self._dropped+=1
+        self._records.append(record)
+
+    def flush(self):
+        """
+        Formats and writes everything logged since the last flush.
+        """
+        if self._dropped :
+            self._write("%sWARNING: %d log messages dropped" % (self.prefix,self._dropped))
+            self._dropped=0
+        while self._records :
+            (level,message,args)=self._records.popleft()
+            if args :
+                try :
+                    message=message % args
+                except (TypeError, ValueError), error :
+                    message="%s %r (%s)" % (message,args,error)
+            self._write("%s%s: %s" % (self.prefix,LEVEL_NAMES[level],message))
@@ -0,0 +1,61 @@
+from _Framework.SessionComponent import SessionComponent
+
+
+class SessionOffsetFollower(object):
+    """
+    Follows the highlighted region of another control surface, so that the scene and clip
+    pedals can work relative to it. The host is any script with a SessionComponent among its
+    components. Rather than asking the host's session for its offsets on every press, they
+    are copied into track_offset and scene_offset whenever the session reports they have
+    changed. Without a host both offsets are zero.
+    """
+    def __init__(self):
+        self.track_offset=0
+        self.scene_offset=0
+        self.host=None
+        self._session=None
+
+    def disconnect(self):
+        self.detach()
+
+    def attach(self, scripts, exclude=None):
+        """
+        Follows the first script in scripts, other than exclude, that has a session. If the
+        script already being followed is still loaded nothing changes. Returns True if
+        there is a host.
+        """
+        for script in scripts :
+            if script is self.host : return True
+        self.detach()
+        for script in scripts :
+            if script is exclude : continue
+            session=self.find_session(script)
+            if session is not None :
+                self.host=script
+                self._session=session
+                session.add_offset_listener(self._on_offset_changed)
+                self._on_offset_changed()
+                return True
+        return False
+
+    def detach(self):
+        if self._session is not None and self._session.offset_has_listener(self._on_offset_changed) :
+            self._session.remove_offset_listener(self._on_offset_changed)
+        self.host=None
+        self._session=None
+        self.track_offset=0
+        self.scene_offset=0
+
+    @staticmethod
+    def find_session(script):
+        """
+        The SessionComponent of a _Framework based script, or None if it doesn't have one.
+        """
+        for component in getattr(script, 'components', ()) :
+            if isinstance(component, SessionComponent) :
+                return component
+        return None
+
+    def _on_offset_changed(self):
+        self.track_offset=self._session.track_offset()
+        self.scene_offset=self._session.scene_offset()
@@ -0,0 +1,103 @@
+from array import array
+from functools import partial
+from ListenerGroup import ListenerGroup
+
+
+class SessionStateMirror(object):
+    """
+    A copy of the per-track and per-clip-slot state the pedal handlers need for the
+    selected scene, kept in flat arrays indexed by track. Every read of a Live property
+    is a trip across to Live, so the handlers read from here instead and listeners keep
+    the arrays up to date. If the tracks or the selected scene change, everything is read
+    again the next time the mirror is used.
+
+    The arrays are arm, implicitArm, hasClip, isRecording and isPlaying; use them after
+    calling update().
+    """
+    FIELDS=('arm', 'implicitArm', 'hasClip', 'isRecording', 'isPlaying')
+
+    def __init__(self, song):
+        self._song=song
+        self._dirty=True
+        self._listeners=ListenerGroup()
+        for field in self.FIELDS :
+            setattr(self, field, array('B'))
+        self._song.add_tracks_listener(self._on_layout_changed)
+        self._song.view.add_selected_scene_listener(self._on_layout_changed)
+
+    def disconnect(self):
+        self._listeners.remove_all()
+        if self._song.tracks_has_listener(self._on_layout_changed) :
+            self._song.remove_tracks_listener(self._on_layout_changed)
+        if self._song.view.selected_scene_has_listener(self._on_layout_changed) :
+            self._song.view.remove_selected_scene_listener(self._on_layout_changed)
+
+    def __len__(self):
+        return len(self.arm)
+
+    def update(self):
+        """
+        Makes sure the arrays are valid. Only does any work if the tracks or the selected
+        scene have changed since the last time.
+        """
+        if not self._dirty : return self
+        self._dirty=False
+        self._listeners.remove_all()
+        tracks=self._song.tracks
+        clipSlots=self._song.view.selected_scene.clip_slots
+        for field in self.FIELDS :
+            setattr(self, field, array('B', [0]*len(tracks)))
+        for index in xrange( len(tracks) ) :
+            self._read_track(index, tracks[index])
+            self._read_clip_slot(index, clipSlots[index])
+            if tracks[index].can_be_armed :
+                onTrackChanged=partial(self._on_track_changed, index)
+                self._listeners.add(tracks[index], 'arm', onTrackChanged)
+                self._listeners.add(tracks[index], 'implicit_arm', onTrackChanged)
+            onClipSlotChanged=partial(self._on_clip_slot_changed, index)
+            self._listeners.add(clipSlots[index], 'has_clip', onClipSlotChanged)
+            self._listeners.add(clipSlots[index], 'playing_status', onClipSlotChanged)
+        return self
+
+    def verify(self):
+        """
+        Compares the mirror with the values Live reports and returns a list of
+        (field, track_index, mirrored, live) tuples for anything that doesn't match.
+        This reads everything from Live, so it's only for checking the mirror is right.
+        """
+        self.update()
+        tracks=self._song.tracks
+        clipSlots=self._song.view.selected_scene.clip_slots
+        mismatches=[]
+        for index in xrange( len(tracks) ) :
+            track=tracks[index]
+            clipSlot=clipSlots[index]
+            canBeArmed=track.can_be_armed
+            liveValues=(canBeArmed and track.arm, canBeArmed and track.implicit_arm, clipSlot.has_clip, clipSlot.is_recording, clipSlot.is_playing)
+            for field,liveValue in zip(self.FIELDS, liveValues) :
+                mirrored=getattr(self, field)[index]
+                if bool(mirrored)!=bool(liveValue) :
+                    mismatches.append( (field, index, bool(mirrored), bool(liveValue)) )
+        return mismatches
+
+    def _on_layout_changed(self):
+        self._dirty=True
+
+    def _on_track_changed(self, index):
+        if self._dirty : return
+        self._read_track(index, self._song.tracks[index])
+
+    def _on_clip_slot_changed(self, index):
+        if self._dirty : return
+        self._read_clip_slot(index, self._song.view.selected_scene.clip_slots[index])
+
+    def _read_track(self, index, track):
+        # Group tracks can't be armed and Live complains if asked for their arm state
+        if not track.can_be_armed : return
+        self.arm[index]=track.arm
+        self.implicitArm[index]=track.implicit_arm
+
+    def _read_clip_slot(self, index, clipSlot):
+        self.hasClip[index]=clipSlot.has_clip
+        self.isRecording[index]=clipSlot.is_recording
+        self.isPlaying[index]=clipSlot.is_playing
@@ -0,0 +1,45 @@
+class TrackInsertPlan(object):
+    """
+    The new tracks needed when recording a new layer and there's no free track with the
+    same input. Each new track goes immediately to the right of its source track and takes
+    the source's input. Everything needed from the source tracks is read when the plan is
+    made. apply() then inserts from the right-most source first, so inserting a track never
+    moves a source that hasn't been handled yet. The track list and clip slots are only
+    fetched again once, after all the inserts.
+    """
+    def __init__(self, tracks, sourceIndices):
+        self._inserts=[]
+        for index in sorted(sourceIndices) :
+            track=tracks[index]
+            self._inserts.append( (index, track.has_audio_input, track.current_input_routing, track.current_input_sub_routing) )
+
+    def __len__(self):
+        return len(self._inserts)
+
+    def apply(self, song):
+        """
+        Creates the tracks, copies the routing across, arms them and fires their slot in the
+        selected scene so that they start recording. Returns a (track, clip_slot) pair for
+        each source track, in the same order as the sources.
+        """
+        for (index,isAudio,routing,subRouting) in reversed(self._inserts) :
+            # Can't use duplicate because it doesn't work if the current track is
+            # currently recording. Insert it immediately to the right
+            if isAudio :
+                song.create_audio_track(index+1)
+            else :
+                song.create_midi_track(index+1)
+
+        tracks=song.tracks
+        clipSlots=song.view.selected_scene.clip_slots
+        sources=[]
+        # Every insert to the left of a source has moved it one to the right
+        for (shift,(index,isAudio,routing,subRouting)) in enumerate(self._inserts) :
+            sourceIndex=index+shift
+            newTrack=tracks[sourceIndex+1]
+            newTrack.current_input_routing=routing
+            newTrack.current_input_sub_routing=subRouting
+            newTrack.arm=True
+            clipSlots[sourceIndex+1].fire()
+            sources.append( (tracks[sourceIndex], clipSlots[sourceIndex]) )
+        return sources
@@ -0,0 +1,39 @@
+class UndoTransaction(object):
+    """
+    Groups everything a pedal press changes into one Live undo step, so a single undo
+    reverses the whole action and the undo history only grows by one entry per press.
+    Used as a context manager, and can be nested: only the outermost block opens and
+    closes the undo step.
+        with self._transaction :
+            ...
+            self._transaction.defer( partial(self.tracksToDisarm.add, track, clipSlot) )
+    Work passed to defer() is run once the outermost block has finished, i.e. after the
+    undo step is closed. If the block raises, the deferred work is thrown away. Outside
+    a transaction defer() runs the work straight away.
+    Versions of Live without Song.begin_undo_step just don't get the grouping.
+    """
+    def __init__(self, song):
+        self._song=song
+        self._canGroup=hasattr(song, 'begin_undo_step') and hasattr(song, 'end_undo_step')
+        self._depth=0
+        self._deferred=[]
+
+    def defer(self, callback):
+        if self._depth==0 : callback()
+        else : self._deferred.append(callback)
+
+    def __enter__(self):
+        if self._depth==0 and self._canGroup : self._song.begin_undo_step()
+        self._depth+=1
+        return self
+
+    def __exit__(self, exceptionType, exception, traceback):
+        self._depth-=1
+        if self._depth>0 : return False
+        if self._canGroup : self._song.end_undo_step()
+        deferred=self._deferred
+        self._deferred=[]
+        if exceptionType is None :
+            for callback in deferred :
+                callback()
+        return False
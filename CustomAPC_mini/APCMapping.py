@@ -0,0 +1,65 @@
+from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_CC_TYPE
+from _Mapping.MappingFile import MappingError, midi_messages, check_overlaps, require
+
+# Change this whenever compile_mapping changes what it returns, so that cached mappings
+# compiled by the old version aren't used.
+MAPPING_VERSION = 1
+
+# The mixer controls a row of buttons can be given, i.e. MixerComponent.set_<control>_buttons
+MIXER_CONTROLS = ( 'track_select', 'mute', 'arm', 'solo' )
+# The colours CustomColourButtonElement knows
+COLOURS = ( 'OFF', 'GREEN', 'GREEN_BLINK', 'RED', 'RED_BLINK', 'AMBER', 'AMBER_BLINK' )
+
+def compile_mapping(source, sessionWidth, sessionHeight):
+    """
+    Checks a parsed APC mini mapping file and returns it as a dictionary with the keys
+        'channel', 'matrix_offset', 'stop_all_button', 'unused_buttons', 'master_volume'
+        'mixer_rows'    a list of (control, first note, on colour, off colour)
+    The file looks like
+        { "channel" : 0,
+          "matrix_offset" : 24,
+          "mixer_rows" : [ { "control" : "arm", "first_note" : 0, "on_colour" : "RED", "off_colour" : "OFF" }, ... ],
+          "stop_all_button" : 89,
+          "unused_buttons" : [87, 88],
+          "master_volume_cc" : 56 }
+    matrix_offset is how far the clip launch matrix is moved up the grid (8 notes per row) to
+    make room for the mixer rows. Each mixer row is sessionWidth buttons starting at first_note.
+    No two controls, including the moved clip launch matrix, can use the same note.
+    """
+    channel=require(source, 'channel', 'mapping')
+    matrixOffset=require(source, 'matrix_offset', 'mapping')
+    if not isinstance(matrixOffset, int) :
+        raise MappingError("mapping: matrix_offset must be a number of notes, not %r" % matrixOffset)
+    controls={ 'clip launch matrix' : midi_messages(MIDI_NOTE_TYPE, channel, range(matrixOffset, matrixOffset+sessionWidth*sessionHeight), 'clip launch matrix') }
+    stopAll=require(source, 'stop_all_button', 'mapping')
+    controls['stop_all_button']=midi_messages(MIDI_NOTE_TYPE, channel, [stopAll], 'stop_all_button')
+    unused=require(source, 'unused_buttons', 'mapping')
+    controls['unused_buttons']=midi_messages(MIDI_NOTE_TYPE, channel, unused, 'unused_buttons')
+    masterVolume=require(source, 'master_volume_cc', 'mapping')
+    controls['master_volume_cc']=midi_messages(MIDI_CC_TYPE, channel, [masterVolume], 'master_volume_cc')
+
+    mixerRows=[]
+    for (index,row) in enumerate( require(source, 'mixer_rows', 'mapping') ) :
+        where="mixer row %d" % (index+1)
+        control=require(row, 'control', where)
+        if control not in MIXER_CONTROLS :
+            raise MappingError("%s: unknown control '%s', should be one of %s" % (where,control,", ".join(MIXER_CONTROLS)))
+        firstNote=require(row, 'first_note', where)
+        if not isinstance(firstNote, int) :
+            raise MappingError("%s: first_note must be a note number, not %r" % (where,firstNote))
+        controls[where]=midi_messages(MIDI_NOTE_TYPE, channel, range(firstNote, firstNote+sessionWidth), where)
+        colours=[]
+        for key in ('on_colour', 'off_colour') :
+            colour=row.get(key, 'OFF')
+            if colour not in COLOURS :
+                raise MappingError("%s: unknown %s '%s', should be one of %s" % (where,key,colour,", ".join(COLOURS)))
+            colours.append( str(colour) )
+        mixerRows.append( (str(control), firstNote, colours[0], colours[1]) )
+    check_overlaps(controls)
+
+    return { 'channel' : channel,
+             'matrix_offset' : matrixOffset,
+             'stop_all_button' : stopAll,
+             'unused_buttons' : list(unused),
+             'master_volume' : masterVolume,
+             'mixer_rows' : mixerRows }
@@ -7,6 +7,12 @@ from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_CC_TYPE
 from _APC.ControlElementUtils import make_slider, make_button
 from APC_Key_25.APC_Key_25 import APC_Key_25
 from functools import partial
+from LedFramebuffer import LedFramebuffer
+from APCMapping import compile_mapping, MAPPING_VERSION
+from _Mapping.MappingFile import load_mapping
+from _Trace.MidiTrace import MidiTraceWriter
+import os
+import time
 import Live
 
 
@@ -15,6 +21,8 @@ class CustomColourButtonElement(ButtonElement):
     A subclass of _Framework.ButtonElement.ButtonElement but allows setting the
     colour value for on/off buttons. Skins don't seem to have any effect on on/off
     buttons as far as I can see.
+    If a LedFramebuffer is given the colours are written to that and sent when it's
+    flushed, rather than being sent every time the button is told to turn on or off.
     """
     OFF = Color(0)
     GREEN = Color(1)
@@ -24,16 +32,19 @@ class CustomColourButtonElement(ButtonElement):
     AMBER = Color(5)
     AMBER_BLINK = Color(6)
 
-    def __init__(self, is_momentary, msg_type, channel, identifier, skin = Skin(), undo_step_handler = DummyUndoStepHandler(), custom_on_value=127, custom_off_value=0, *a, **k):
+    def __init__(self, is_momentary, msg_type, channel, identifier, skin = Skin(), undo_step_handler = DummyUndoStepHandler(), custom_on_value=127, custom_off_value=0, framebuffer=None, *a, **k):
         super(CustomColourButtonElement, self).__init__(is_momentary, msg_type, channel, identifier, skin, undo_step_handler, *a, **k)
         self.custom_on_value=custom_on_value
         self.custom_off_value=custom_off_value
+        self.framebuffer=framebuffer
 
     def turn_on(self):
-        self.send_value(self.custom_on_value)
+        if self.framebuffer is not None : self.framebuffer.set(self, self.custom_on_value)
+        else : self.send_value(self.custom_on_value)
 
     def turn_off(self):
-        self.send_value(self.custom_off_value)
+        if self.framebuffer is not None : self.framebuffer.set(self, self.custom_off_value)
+        else : self.send_value(self.custom_off_value)
 
 
 class CustomAPC_mini(APC_Key_25):
@@ -43,40 +54,82 @@ class CustomAPC_mini(APC_Key_25):
     """
     SESSION_HEIGHT = 5
     HAS_TRANSPORT = False
+    MAX_LED_MESSAGES_PER_TICK = 32 # The most LED changes sent to the device per update_display
+    # Where the clip launch matrix sits on the grid, what the mixer rows below it do and the other
+    # custom buttons. See APCMapping.compile_mapping for the format. The compiled form is cached
+    # alongside the file until it changes.
+    MAPPING_FILE = os.path.join( os.path.dirname(os.path.abspath(__file__)), 'APC_mini.json' )
+    # Set to a file path to record every MIDI message the script receives, with timestamps, so
+    # that the session can be replayed with benchmarks/replay_trace.py. The path goes through
+    # time.strftime, so e.g. '/tmp/apc-mini-%Y%m%d-%H%M%S.midt' gives a new file each time.
+    MIDI_TRACE_FILE = None
 
     def __init__(self, *a, **k):
         super(CustomAPC_mini, self).__init__(*a, **k)
         with self.component_guard():
             self.register_disconnectable(SimpleLayerOwner(layer=Layer(_unused_buttons=self.wrap_matrix(self._unused_buttons))))
-        self._mixer.set_track_select_buttons( self._custom_matrix_buttons_row1 )
-        self._mixer.set_mute_buttons( self._custom_matrix_buttons_row2 )
-        self._mixer.set_arm_buttons( self._custom_matrix_buttons_row3 )
+        for ((control,firstNote,onColour,offColour),buttons) in zip(self._mapping['mixer_rows'], self._custom_matrix_rows) :
+            getattr(self._mixer, 'set_%s_buttons' % control)( buttons )
         #self.song().exclusive_arm(True) # gives TypeError 'bool' object is not callable
+        self._midi_trace = None
+        if self.MIDI_TRACE_FILE is not None :
+            try :
+                self._midi_trace = MidiTraceWriter(time.strftime(self.MIDI_TRACE_FILE), 'CustomAPC_mini')
+                self.register_disconnectable(self._midi_trace)
+            except IOError, error :
+                self.log_message("Couldn't open MIDI trace file: %s" % error)
+
+    def disconnect(self):
+        if self._midi_trace is not None :
+            self.log_message("MIDI trace: %s" % self._midi_trace.summary())
+        super(CustomAPC_mini, self).disconnect()
+
+    def receive_midi(self, midi_bytes):
+        if self._midi_trace is not None : self._midi_trace.record(midi_bytes)
+        super(CustomAPC_mini, self).receive_midi(midi_bytes)
+
+    def update_display(self):
+        super(CustomAPC_mini, self).update_display()
+        self._led_framebuffer.flush()
+        if self._midi_trace is not None : self._midi_trace.flush()
+
+    def refresh_state(self):
+        # Called when the device has been reconnected, so it could be showing anything.
+        # Send every LED again.
+        self._led_framebuffer.invalidate()
+        super(CustomAPC_mini, self).refresh_state()
 
     def _make_stop_all_button(self):
         #return self.make_shifted_button(self._scene_launch_buttons[7])
-        return make_button(0, 89, name='Scene_Launch_8', skin=self._color_skin )
+        return make_button(self._mapping['channel'], self._mapping['stop_all_button'], name='Scene_Launch_8', skin=self._color_skin )
 
     def _create_controls(self):
+        # Everything below, and _make_stop_all_button which the base class calls, comes from the
+        # mapping file so it has to be loaded first
+        self._mapping=load_mapping(self.MAPPING_FILE, compile_mapping, MAPPING_VERSION, (self.SESSION_WIDTH, self.SESSION_HEIGHT))
+        channel=self._mapping['channel']
         super(CustomAPC_mini, self)._create_controls()
-        # Need to shift the active part of the matrix up 3 rows
+        # Need to shift the active part of the matrix up to make room for the mixer rows
         for row in self._matrix_buttons :
             for button in row :
-                button._msg_identifier+=24
-                button._original_identifier+=24
+                button._msg_identifier+=self._mapping['matrix_offset']
+                button._original_identifier+=self._mapping['matrix_offset']
+        # The mixer driven rows can change a lot of LEDs at once, so they go through a framebuffer
+        # that's flushed in update_display.
+        self._led_framebuffer = LedFramebuffer(self.MAX_LED_MESSAGES_PER_TICK)
         # Now set my custom buttons to something
-        self._custom_session_buttons = [ make_button(0, index + 87, name='Custom_session_button_%d' % (index + 1), skin=self._color_skin) for index in xrange(3) ]
+        self._custom_session_buttons = [ make_button(channel, note, name='Custom_session_button_%d' % (index + 1), skin=self._color_skin) for (index,note) in enumerate(self._mapping['unused_buttons']) ]
         #self._custom_matrix_buttons = [[ make_button(0,xIndex+self.SESSION_WIDTH*(self.SESSION_HEIGHT-yIndex-1), name='Custom_matrix_button_%d_%d' % (xindex+1,yIndex+1), skin=self._color_skin) for yIndex in xrange(self.SESSION_WIDTH) ] for xIndex in xrange(3)]
 
-        #self._custom_matrix_buttons_row1 = [ make_button(0,xIndex+self.SESSION_WIDTH*2, name='Custom_matrix_button_%d_%d' % (xIndex+1,1), skin=self._custom_select_colors) for xIndex in xrange(self.SESSION_WIDTH) ]
-        self._custom_matrix_buttons_row1 = [ CustomColourButtonElement(True,MIDI_NOTE_TYPE,0,xIndex+self.SESSION_WIDTH*2, name='Custom_matrix_button_%d_%d' % (xIndex+1,1), custom_on_value=CustomColourButtonElement.AMBER) for xIndex in xrange(self.SESSION_WIDTH) ]
-        self._custom_matrix_buttons_row2 = [ CustomColourButtonElement(True,MIDI_NOTE_TYPE,0,xIndex+self.SESSION_WIDTH*1, name='Custom_matrix_button_%d_%d' % (xIndex+1,2), custom_off_value=CustomColourButtonElement.RED, custom_on_value=CustomColourButtonElement.OFF) for xIndex in xrange(self.SESSION_WIDTH) ]
-        self._custom_matrix_buttons_row3 = [ CustomColourButtonElement(True,MIDI_NOTE_TYPE,0,xIndex+self.SESSION_WIDTH*0, name='Custom_matrix_button_%d_%d' % (xIndex+1,3), custom_on_value=CustomColourButtonElement.RED) for xIndex in xrange(self.SESSION_WIDTH) ]
+        # One row of buttons for each of the mapping's mixer rows, in the same order
+        self._custom_matrix_rows = []
+        for (rowIndex,(control,firstNote,onColour,offColour)) in enumerate(self._mapping['mixer_rows']) :
+            self._custom_matrix_rows.append( [ CustomColourButtonElement(True,MIDI_NOTE_TYPE,channel,firstNote+xIndex, name='Custom_matrix_button_%d_%d' % (xIndex+1,rowIndex+1), custom_on_value=getattr(CustomColourButtonElement,onColour), custom_off_value=getattr(CustomColourButtonElement,offColour), framebuffer=self._led_framebuffer) for xIndex in xrange(self.SESSION_WIDTH) ] )
         
-        self.custom_arms = Layer(arm_buttons=self.wrap_matrix(self._custom_matrix_buttons_row1))
+        self.custom_arms = Layer(arm_buttons=self.wrap_matrix(self._custom_matrix_rows[0]))
         #self._unused_buttons = map(self.make_shifted_button, self._scene_launch_buttons[5:7])
         self._unused_buttons = self._custom_session_buttons
-        self._master_volume_control = make_slider(0, 56, name='Master_Volume')
+        self._master_volume_control = make_slider(channel, self._mapping['master_volume'], name='Master_Volume')
 
     def _create_mixer(self):
         mixer = super(CustomAPC_mini, self)._create_mixer()
@@ -0,0 +1,58 @@
+from collections import deque
+
+
+class LedFramebuffer(object):
+    """
+    Remembers the colour last sent to each LED on the device and the colour it should
+    be showing. Buttons write to the framebuffer instead of sending straight away, and
+    flush() sends only the LEDs whose colour has actually changed, at most
+    max_messages_per_tick of them each time it's called. Anything over the cap waits for
+    the next flush. The APC mini drops messages if too many arrive at once, e.g. when the
+    mixer relights every select, mute and arm button during a bank move.
+    """
+    def __init__(self, max_messages_per_tick=32):
+        self.max_messages_per_tick=max_messages_per_tick
+        self._buttons={} # Key is (channel, note), value is the button that lights it
+        self._wanted={} # Key is (channel, note), value is the MIDI value it should show
+        self._sent={} # Key is (channel, note), value is the MIDI value last sent
+        self._changed=deque() # Keys to look at on the next flush, in the order they changed
+        self._isChanged=set()
+
+    def set(self, button, value):
+        """
+        Sets the colour an LED should show. value is a MIDI value or a Color.
+        """
+        key=(button.message_channel(), button.message_identifier())
+        value=int( getattr(value, 'midi_value', value) )
+        self._buttons[key]=button
+        self._wanted[key]=value
+        if key not in self._isChanged and self._sent.get(key)!=value :
+            self._isChanged.add(key)
+            self._changed.append(key)
+
+    def flush(self):
+        """
+        Sends the LEDs that have changed since they were last sent, up to the rate cap.
+        Returns the number of messages sent.
+        """
+        sent=0
+        while self._changed and sent<self.max_messages_per_tick :
+            key=self._changed.popleft()
+            self._isChanged.discard(key)
+            value=self._wanted[key]
+            if self._sent.get(key)==value : continue # Changed back before it was sent
+            self._buttons[key].send_value(value, True)
+            self._sent[key]=value
+            sent+=1
+        return sent
+
+    def invalidate(self):
+        """
+        Forgets what the device is showing, so that every LED is sent again over the next
+        flushes. Used when the device has been reconnected.
+        """
+        self._sent.clear()
+        for key in self._wanted :
+            if key not in self._isChanged :
+                self._isChanged.add(key)
+                self._changed.append(key)
@@ -0,0 +1,108 @@
+import os
+import json
+import cPickle
+from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_CC_TYPE
+
+CACHE_SUFFIX = '.cache'
+MESSAGE_TYPES = { MIDI_NOTE_TYPE : 'note', MIDI_CC_TYPE : 'CC' }
+
+# Compiled mappings already loaded by this Python session, keyed by the mapping file path.
+# Live creates a new script instance every time a set is loaded without importing the
+# modules again, so this saves even reading the cache file.
+_loaded = {}
+
+
+class MappingError(ValueError):
+    """
+    Raised when a mapping file can't be read or doesn't make sense, e.g. two controls
+    are assigned the same MIDI message.
+    """
+    pass
+
+
+def load_mapping(path, compileFunction, version=0, args=()):
+    """
+    Returns the compiled form of the JSON mapping file at path. compileFunction is called with
+    the parsed JSON and then *args, and should check it and turn it into whatever the script
+    wants to use (which has to be picklable). The result is cached in path+CACHE_SUFFIX and
+    reused until the mapping file changes. Change version whenever compileFunction changes
+    what it returns, so that old caches are thrown away.
+    """
+    try :
+        status=os.stat(path)
+    except OSError, error :
+        raise MappingError("Couldn't read mapping file %s: %s" % (path,error))
+    stamp=(status.st_mtime, status.st_size, compileFunction.__module__, compileFunction.__name__, version, tuple(args))
+    if path in _loaded and _loaded[path][0]==stamp :
+        return _loaded[path][1]
+
+    compiled=_read_cache(path+CACHE_SUFFIX, stamp)
+    if compiled is None :
+        try :
+            with open(path) as mappingFile :
+                source=json.load(mappingFile)
+        except ValueError, error :
+            raise MappingError("Mapping file %s isn't valid JSON: %s" % (path,error))
+        compiled=compileFunction(source, *args)
+        _write_cache(path+CACHE_SUFFIX, stamp, compiled)
+    _loaded[path]=(stamp, compiled)
+    return compiled
+
+def _read_cache(cachePath, stamp):
+    try :
+        with open(cachePath, 'rb') as cacheFile :
+            (cachedStamp,compiled)=cPickle.load(cacheFile)
+    except Exception :
+        # Missing, unreadable or written by something else. Either way just compile again.
+        return None
+    if cachedStamp!=stamp : return None
+    return compiled
+
+def _write_cache(cachePath, stamp, compiled):
+    try :
+        with open(cachePath, 'wb') as cacheFile :
+            cPickle.dump( (stamp,compiled), cacheFile, cPickle.HIGHEST_PROTOCOL )
+    except (IOError, OSError) :
+        # The scripts directory is inside the application bundle and might not be writable.
+        # That only means the mapping gets compiled every time.
+        pass
+
+def midi_messages(messageType, channel, identifiers, where):
+    """
+    Checks the channel and the list of note or CC numbers taken from the mapping file, and
+    returns them as (type, channel, identifier) tuples like the scripts use. where says which
+    part of the file they came from for the error message.
+    """
+    if not isinstance(channel, int) or not 0<=channel<16 :
+        raise MappingError("%s: MIDI channel must be 0 to 15, not %r" % (where,channel))
+    if not isinstance(identifiers, list) :
+        raise MappingError("%s: expected a list of %s numbers, not %r" % (where,MESSAGE_TYPES[messageType],identifiers))
+    messages=[]
+    for identifier in identifiers :
+        if not isinstance(identifier, int) or not 0<=identifier<128 :
+            raise MappingError("%s: %s number must be 0 to 127, not %r" % (where,MESSAGE_TYPES[messageType],identifier))
+        messages.append( (messageType, channel, identifier) )
+    return messages
+
+def check_overlaps(controls):
+    """
+    Raises a MappingError if any MIDI message is used by more than one control, or more than
+    once by the same control. controls maps a description of each control to its list of
+    (type, channel, identifier) messages.
+    """
+    owners={}
+    for name in sorted(controls) :
+        for message in controls[name] :
+            if message in owners :
+                raise MappingError("%s %d on channel %d is assigned to both %s and %s" % (MESSAGE_TYPES[message[0]],message[2],message[1]+1,owners[message],name))
+            owners[message]=name
+
+def require(source, key, where):
+    """
+    Returns source[key], raising a MappingError that says what's missing if it isn't there.
+    """
+    if not isinstance(source, dict) :
+        raise MappingError("%s: expected an object, not %r" % (where,source))
+    if key not in source :
+        raise MappingError("%s: '%s' is missing" % (where,key))
+    return source[key]
@@ -0,0 +1,4 @@
+"""
+Loading of the controller mapping files shared by the control surface scripts in this
+repository. See MappingFile.
+"""
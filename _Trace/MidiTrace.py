@@ -0,0 +1,83 @@
+import struct
+import time
+
+# A trace file is a header followed by one record for each MIDI message. Times are stored
+# as microseconds since the previous message so a record is usually only 6 bytes plus the
+# message itself.
+MAGIC = 'MIDT'
+VERSION = 2
+HEADER = struct.Struct('<4sBdB') # magic, version, start time (time.time), length of the script name
+RECORD = struct.Struct('<IH') # microseconds since the previous message, number of MIDI bytes
+# Version 1 only had a byte for the length, which sysex messages can be too long for
+RECORDS = { 1 : struct.Struct('<IB'), 2 : RECORD }
+MAX_DELTA = 0xFFFFFFFF # about 71 minutes, longer gaps are shortened to this
+MAX_LENGTH = 0xFFFF # messages longer than this aren't recorded
+
+
+class MidiTraceWriter(object):
+    """
+    Writes every MIDI message passed to record() to a trace file, with the time it arrived.
+    Records are only packed into a buffer by record(), which is called from receive_midi, and
+    written to the file by flush(), which the scripts call from update_display. Messages too
+    long to record (only ever huge sysex dumps) are left out and counted in skipped.
+    """
+    def __init__(self, path, scriptName, clock=time.time):
+        self.path=path
+        self._clock=clock
+        self._file=open(path, 'wb')
+        self._buffer=[]
+        self._lastTime=clock()
+        self.recorded=0
+        self.skipped=0
+        self._file.write( HEADER.pack(MAGIC, VERSION, self._lastTime, len(scriptName))+scriptName )
+
+    def record(self, midi_bytes):
+        if len(midi_bytes)>MAX_LENGTH :
+            self.skipped+=1
+            return
+        now=self._clock()
+        delta=min( MAX_DELTA, max(0, int( (now-self._lastTime)*1000000 )) )
+        self._lastTime=now
+        self.recorded+=1
+        self._buffer.append( RECORD.pack(delta, len(midi_bytes))+struct.pack('%dB' % len(midi_bytes), *midi_bytes) )
+
+    def summary(self):
+        return "%d messages recorded to %s, %d too long to record were left out" % (self.recorded, self.path, self.skipped)
+
+    def flush(self):
+        if len(self._buffer)==0 : return
+        self._file.write( ''.join(self._buffer) )
+        self._buffer=[]
+        self._file.flush()
+
+    def disconnect(self):
+        if self._file.closed : return
+        self.flush()
+        self._file.close()
+
+
+def read_trace(path):
+    """
+    Reads a trace file written by MidiTraceWriter. Returns (scriptName, startTime, events)
+    where events is a list of (seconds since the start, MIDI bytes tuple).
+    """
+    with open(path, 'rb') as traceFile :
+        data=traceFile.read()
+    if len(data)<HEADER.size :
+        raise ValueError("%s is too short to be a MIDI trace" % path)
+    (magic,version,startTime,nameLength)=HEADER.unpack_from(data, 0)
+    if magic!=MAGIC : raise ValueError("%s isn't a MIDI trace" % path)
+    record=RECORDS.get(version)
+    if record is None : raise ValueError("%s is a version %d MIDI trace, only versions up to %d can be read" % (path,version,VERSION))
+    position=HEADER.size+nameLength
+    scriptName=data[HEADER.size:position]
+    events=[]
+    seconds=0.0
+    while position+record.size<=len(data) :
+        (delta,length)=record.unpack_from(data, position)
+        position+=record.size
+        if position+length>len(data) : break # Cut off part way through a record, e.g. Live crashed
+        seconds+=delta/1000000.0
+        events.append( (seconds, struct.unpack_from('%dB' % length, data, position)) )
+        position+=length
+    return (scriptName, startTime, events)
@@ -0,0 +1,4 @@
+"""
+Recording of the MIDI the control surface scripts in this repository receive, so that it
+can be replayed later. See MidiTrace.
+"""
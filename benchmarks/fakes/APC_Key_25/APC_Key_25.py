@@ -0,0 +1,49 @@
+from __future__ import with_statement
+from _Framework.ControlSurface import ControlSurface
+from _Framework.ButtonMatrixElement import ButtonMatrixElement
+from _Framework.SessionComponent import SessionComponent
+from _Framework.MixerComponent import MixerComponent
+from _Framework.Skin import Skin
+from _APC.ControlElementUtils import make_button, make_slider
+
+
+class APC_Key_25(ControlSurface):
+    """
+    The outline of Live's APC_Key_25 script that CustomAPC_mini builds on: an 8 wide
+    clip launch matrix, scene launch buttons, a session and a mixer.
+    """
+    SESSION_WIDTH = 8
+    SESSION_HEIGHT = 5
+    HAS_TRANSPORT = True
+
+    def __init__(self, *a, **k):
+        super(APC_Key_25, self).__init__(*a, **k)
+        with self.component_guard():
+            self._color_skin = Skin()
+            self._create_controls()
+            self._session = self._create_session()
+            self._mixer = self._create_mixer()
+
+    def _create_controls(self):
+        self._matrix_buttons = [ [ make_button(0, (self.SESSION_HEIGHT - row - 1) * self.SESSION_WIDTH + column, name='%d_Clip_%d_Button' % (column, row), skin=self._color_skin) for column in xrange(self.SESSION_WIDTH) ] for row in xrange(self.SESSION_HEIGHT) ]
+        self._scene_launch_buttons = [ make_button(0, index + 82, name='Scene_Launch_%d' % (index + 1), skin=self._color_skin) for index in xrange(self.SESSION_HEIGHT) ]
+        self._stop_all_button = self._make_stop_all_button()
+        self._session_matrix = ButtonMatrixElement(rows=self._matrix_buttons, name='Button_Matrix')
+
+    def _make_stop_all_button(self):
+        return make_button(0, 81, name='Stop_All_Clips_Button', skin=self._color_skin)
+
+    def _create_session(self):
+        return SessionComponent(self.SESSION_WIDTH, self.SESSION_HEIGHT, name='Session')
+
+    def _create_mixer(self):
+        return MixerComponent(self.SESSION_WIDTH, name='Mixer')
+
+    def wrap_matrix(self, control_list, wrapper = None):
+        return ButtonMatrixElement(rows=[control_list])
+
+    def make_shifted_button(self, button):
+        return button
+
+    def _product_model_id_byte(self):
+        return 39
@@ -0,0 +1,537 @@
+"""
+A headless stand-in for the parts of Live's Python API that the scripts in this
+repository use, so that they can be run and timed outside of Ableton Live.
+
+Every read or write of a public attribute on a Live object goes through
+LiveObject.__getattribute__/__setattr__ and is counted in ACCESS_COUNTER, which is
+how the benchmarks report Live API round-trips. Code inside this module only uses
+the underscore-prefixed attributes so it doesn't inflate the counts.
+
+Clip launching is quantised in Live, so fire() only marks a slot as triggered; call
+Song.advance() to simulate the launch quantisation point being reached. Like Live,
+state can't be changed from inside a listener notification.
+"""
+
+
+class AccessCounter(object):
+    def __init__(self):
+        self.count=0
+
+    def reset(self):
+        count=self.count
+        self.count=0
+        return count
+
+
+ACCESS_COUNTER=AccessCounter()
+_notification_depth=[0]
+
+
+def _check_not_notifying():
+    if _notification_depth[0]>0 :
+        raise RuntimeError("Changes cannot be triggered by notifications. You will need to defer your response.")
+
+
+class LiveObject(object):
+    """
+    Base class providing listener support and access counting. Listenable properties
+    are named in _listenable; add_<name>_listener, remove_<name>_listener and
+    <name>_has_listener are provided for each of them.
+    """
+    _listenable=()
+
+    def __init__(self):
+        object.__setattr__(self, '_listeners', {})
+
+    def __getattribute__(self, name):
+        if name[0]!='_' : ACCESS_COUNTER.count+=1
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        if name[0]!='_' :
+            ACCESS_COUNTER.count+=1
+            _check_not_notifying()
+        object.__setattr__(self, name, value)
+
+    def __getattr__(self, name):
+        # Only called when normal lookup fails, i.e. for the listener methods
+        for prefix,suffix,method in (('add_','_listener',self._add_listener),
+                                     ('remove_','_listener',self._remove_listener),
+                                     ('','_has_listener',self._has_listener)) :
+            if name.startswith(prefix) and name.endswith(suffix) :
+                propertyName=name[len(prefix):-len(suffix)]
+                if propertyName in self._listenable :
+                    return lambda callback : method(propertyName, callback)
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+
+    def _add_listener(self, name, callback):
+        listeners=self._listeners.setdefault(name, [])
+        if callback in listeners :
+            raise RuntimeError("Listener already connected")
+        listeners.append(callback)
+
+    def _remove_listener(self, name, callback):
+        self._listeners[name].remove(callback)
+
+    def _has_listener(self, name, callback):
+        return callback in self._listeners.get(name, ())
+
+    def _listener_count(self):
+        return sum( len(listeners) for listeners in self._listeners.itervalues() )
+
+    def _notify(self, name):
+        listeners=self._listeners.get(name)
+        if not listeners : return
+        _notification_depth[0]+=1
+        try :
+            for callback in listeners[:] :
+                callback()
+        finally :
+            _notification_depth[0]-=1
+
+    def _set(self, name, value, notification=None):
+        """
+        Changes an underscore attribute and notifies listeners if the value changed.
+        """
+        if getattr(self, '_'+name)==value : return
+        object.__setattr__(self, '_'+name, value)
+        self._notify(notification or name)
+
+
+class DeviceParameter(LiveObject):
+    _listenable=('value',)
+
+    def __init__(self, name, value=0.0, min=0.0, max=1.0):
+        super(DeviceParameter, self).__init__()
+        self._name=name
+        self._value=value
+        self._min=min
+        self._max=max
+
+    name=property(lambda self : self._name)
+    min=property(lambda self : self._min)
+    max=property(lambda self : self._max)
+
+    def _set_value(self, value):
+        if not self._min<=value<=self._max :
+            raise RuntimeError("Invalid value")
+        self._set('value', value)
+    value=property(lambda self : self._value, _set_value)
+
+
+class ClipSlot(LiveObject):
+    """
+    A clip slot. The clip itself is represented by an id number so that song states
+    can be compared; 0 means there isn't a clip.
+    """
+    _listenable=('has_clip', 'playing_status', 'is_triggered')
+    _next_clip_id=[1]
+
+    def __init__(self, song, track):
+        super(ClipSlot, self).__init__()
+        self._song=song
+        self._track=track
+        self._clip_id=0
+        self._is_playing=False
+        self._is_recording=False
+        self._is_triggered=False
+        self._records_on_launch=True
+
+    has_clip=property(lambda self : self._clip_id!=0)
+    is_playing=property(lambda self : self._is_playing)
+    is_recording=property(lambda self : self._is_recording)
+    is_triggered=property(lambda self : self._is_triggered)
+    playing_status=property(lambda self : self._playing_status())
+    has_stop_button=property(lambda self : True)
+
+    def _playing_status(self):
+        if self._is_recording : return 2
+        if self._is_playing : return 1
+        return 0
+
+    def fire(self):
+        _check_not_notifying()
+        self._fire()
+
+    def _fire(self, recordIfArmed=True):
+        # Firing a slot that's already waiting to launch doesn't do anything more
+        if self._is_triggered : return
+        self._records_on_launch=recordIfArmed
+        self._set('is_triggered', True)
+        self._song._launch_queue.append(self)
+
+    def stop(self):
+        _check_not_notifying()
+        self._stop()
+
+    def delete_clip(self):
+        _check_not_notifying()
+        if self._clip_id==0 : return
+        self._stop()
+        self._set_clip(0)
+
+    def _new_clip_id(self):
+        clipId=ClipSlot._next_clip_id[0]
+        ClipSlot._next_clip_id[0]+=1
+        return clipId
+
+    def _set_clip(self, clipId):
+        if self._clip_id==clipId : return
+        self._clip_id=clipId
+        self._notify('has_clip')
+
+    def _set_playing(self, isPlaying, isRecording=False):
+        if (self._is_playing,self._is_recording)==(isPlaying,isRecording) : return
+        self._is_playing=isPlaying
+        self._is_recording=isRecording
+        self._notify('playing_status')
+
+    def _stop(self):
+        # Stopping a slot that's waiting to launch cancels the launch
+        if self._is_triggered :
+            self._song._launch_queue.remove(self)
+            self._set('is_triggered', False)
+        if self._track._playing_slot is self : self._track._playing_slot=None
+        self._set_playing(False)
+
+    def _launch(self):
+        """
+        What happens when the launch quantisation point is reached after fire().
+        """
+        self._set('is_triggered', False)
+        track=self._track
+        if self._is_recording :
+            self._set_playing(True)
+            return
+        if self._clip_id==0 and not ((track._arm or track._implicit_arm) and self._records_on_launch) :
+            # Firing an empty slot stops whatever else is playing on the track
+            if track._playing_slot is not None : track._playing_slot._stop()
+            return
+        if track._playing_slot is not None and track._playing_slot is not self :
+            track._playing_slot._stop()
+        track._playing_slot=self
+        if self._clip_id==0 :
+            self._set_clip( self._new_clip_id() )
+            self._set_playing(True, True)
+        else :
+            self._set_playing(True)
+
+
+class MixerDevice(LiveObject):
+    def __init__(self, numberOfSends=2):
+        super(MixerDevice, self).__init__()
+        self._volume=DeviceParameter('Track Volume', 0.85)
+        self._panning=DeviceParameter('Track Panning', 0.0, -1.0, 1.0)
+        self._sends=tuple( DeviceParameter('Send %s' % chr(ord('A')+index)) for index in xrange(numberOfSends) )
+
+    volume=property(lambda self : self._volume)
+    panning=property(lambda self : self._panning)
+    sends=property(lambda self : self._sends)
+
+
+class Device(LiveObject):
+    def __init__(self, name, numberOfParameters=8):
+        super(Device, self).__init__()
+        self._name=name
+        self._parameters=tuple( [DeviceParameter('Device On', 1.0)]+[DeviceParameter('Macro %d' % (index+1)) for index in xrange(numberOfParameters)] )
+
+    name=property(lambda self : self._name)
+    parameters=property(lambda self : self._parameters)
+
+
+class TrackView(LiveObject):
+    _listenable=('selected_device',)
+
+    def __init__(self, track):
+        super(TrackView, self).__init__()
+        self._track=track
+
+    selected_device=property(lambda self : self._track._devices[0] if self._track._devices else None)
+
+
+class Track(LiveObject):
+    _listenable=('arm', 'implicit_arm', 'mute', 'solo', 'name', 'current_input_routing', 'current_input_sub_routing',
+                 'playing_slot_index', 'fired_slot_index', 'clip_slots', 'devices')
+
+    def __init__(self, song, name, numberOfScenes, isAudio=True, inputRouting='Ext. In', inputSubRouting='1'):
+        super(Track, self).__init__()
+        self._song=song
+        self._name=name
+        self._is_audio=isAudio
+        self._arm=False
+        self._implicit_arm=False
+        self._mute=False
+        self._solo=False
+        self._current_input_routing=inputRouting
+        self._current_input_sub_routing=inputSubRouting
+        self._slots=[None]*numberOfScenes # Clip slots are created the first time they're needed
+        self._playing_slot=None
+        self._mixer_device=MixerDevice()
+        self._devices=[Device('Device')]
+        self._view=TrackView(self)
+
+    def _slot(self, index):
+        slot=self._slots[index]
+        if slot is None :
+            slot=ClipSlot(self._song, self)
+            self._slots[index]=slot
+        return slot
+
+    def _set_arm(self, value):
+        self._set('arm', bool(value))
+        # Disarming a track that's recording stops the recording immediately
+        if not (self._arm or self._implicit_arm) and self._playing_slot is not None and self._playing_slot._is_recording :
+            self._playing_slot._set_playing(True)
+
+    def _set_implicit_arm(self, value):
+        self._set('implicit_arm', bool(value))
+
+    name=property(lambda self : self._name, lambda self, value : self._set('name', value))
+    arm=property(lambda self : self._arm, _set_arm)
+    implicit_arm=property(lambda self : self._implicit_arm, _set_implicit_arm)
+    mute=property(lambda self : self._mute, lambda self, value : self._set('mute', bool(value)))
+    solo=property(lambda self : self._solo, lambda self, value : self._set('solo', bool(value)))
+    can_be_armed=property(lambda self : True)
+    is_foldable=property(lambda self : False)
+    has_audio_input=property(lambda self : self._is_audio)
+    has_midi_input=property(lambda self : not self._is_audio)
+    current_input_routing=property(lambda self : self._current_input_routing,
+                                   lambda self, value : self._set('current_input_routing', value))
+    current_input_sub_routing=property(lambda self : self._current_input_sub_routing,
+                                       lambda self, value : self._set('current_input_sub_routing', value))
+    clip_slots=property(lambda self : tuple( self._slot(index) for index in xrange(len(self._slots)) ))
+    playing_slot_index=property(lambda self : self._slot_index(self._playing_slot))
+    fired_slot_index=property(lambda self : -1)
+    mixer_device=property(lambda self : self._mixer_device)
+    devices=property(lambda self : tuple(self._devices))
+    view=property(lambda self : self._view)
+
+    def _slot_index(self, slot):
+        if slot is None : return -1
+        for index in xrange( len(self._slots) ) :
+            if self._slots[index] is slot : return index
+        return -1
+
+    def duplicate_clip_slot(self, index):
+        """
+        Copies the clip at index into the next empty slot below it.
+        """
+        _check_not_notifying()
+        source=self._slot(index)
+        if source._clip_id==0 : raise RuntimeError("No clip in slot")
+        for target in xrange( index+1, len(self._slots) ) :
+            if self._slot(target)._clip_id==0 :
+                self._slot(target)._set_clip( source._new_clip_id() )
+                return target
+        self._song._insert_scene( len(self._song._scenes) )
+        self._slot( len(self._slots)-1 )._set_clip( source._new_clip_id() )
+        return len(self._slots)-1
+
+
+class Scene(LiveObject):
+    _listenable=('name', 'is_triggered')
+
+    def __init__(self, song, name):
+        super(Scene, self).__init__()
+        self._song=song
+        self._name=name
+        self._index=0 # Kept up to date by the song
+
+    name=property(lambda self : self._name, lambda self, value : self._set('name', value))
+    clip_slots=property(lambda self : tuple( track._slot(self._index) for track in self._song._tracks ))
+    is_triggered=property(lambda self : False)
+
+    def fire(self, force_legato=False, can_select_scene_on_launch=True):
+        _check_not_notifying()
+        for track in self._song._tracks :
+            track._slot(self._index)._fire(self._song._record_on_scene_launch)
+
+    def fire_as_selected(self, force_legato=False):
+        self.fire(force_legato)
+
+
+class SongView(LiveObject):
+    _listenable=('selected_scene', 'selected_track', 'selected_parameter', 'detail_clip')
+
+    def __init__(self, song):
+        super(SongView, self).__init__()
+        self._song=song
+        self._selected_scene=None
+        self._selected_track=None
+
+    def _set_selected_scene(self, scene):
+        self._set('selected_scene', scene)
+
+    def _set_selected_track(self, track):
+        self._set('selected_track', track)
+
+    selected_scene=property(lambda self : self._selected_scene, _set_selected_scene)
+    selected_track=property(lambda self : self._selected_track, _set_selected_track)
+
+    def _selected_parameter(self):
+        track=self._selected_track
+        if track is None or not track._devices : return None
+        return track._devices[0]._parameters[1]
+    selected_parameter=property(_selected_parameter)
+
+
+class Song(LiveObject):
+    _listenable=('tracks', 'scenes', 'metronome', 'is_playing', 'visible_tracks', 'return_tracks')
+
+    def __init__(self):
+        super(Song, self).__init__()
+        self._tracks=[]
+        self._scenes=[]
+        self._return_tracks=[]
+        self._master_track=Track(self, 'Master', 0)
+        self._view=SongView(self)
+        self._metronome=False
+        self._is_playing=False
+        self._launch_queue=[]
+        self._undo_steps=0
+        self._undo_depth=0
+        # Live's "Start Recording on Scene Launch" preference, which is off by default
+        self._record_on_scene_launch=False
+
+    tracks=property(lambda self : tuple(self._tracks))
+    visible_tracks=property(lambda self : tuple(self._tracks))
+    return_tracks=property(lambda self : tuple(self._return_tracks))
+    master_track=property(lambda self : self._master_track)
+    scenes=property(lambda self : tuple(self._scenes))
+    view=property(lambda self : self._view)
+    metronome=property(lambda self : self._metronome, lambda self, value : self._set('metronome', bool(value)))
+    is_playing=property(lambda self : self._is_playing, lambda self, value : self._set('is_playing', bool(value)))
+    can_undo=property(lambda self : self._undo_steps>0)
+
+    def _record_undo_step(self):
+        # Outside of an explicit undo step every change is its own step
+        if self._undo_depth==0 : self._undo_steps+=1
+
+    def _renumber_scenes(self):
+        for index in xrange( len(self._scenes) ) :
+            self._scenes[index]._index=index
+
+    def _insert_scene(self, index):
+        if index<0 : index=len(self._scenes)
+        scene=Scene(self, '')
+        self._scenes.insert(index, scene)
+        for track in self._tracks :
+            track._slots.insert(index, None)
+        self._renumber_scenes()
+        self._record_undo_step()
+        self._notify('scenes')
+        return scene
+
+    def _insert_track(self, index, isAudio):
+        if index<0 : index=len(self._tracks)
+        if isAudio :
+            track=Track(self, '%d Audio' % (index+1), len(self._scenes), True, 'Ext. In', '1')
+        else :
+            track=Track(self, '%d MIDI' % (index+1), len(self._scenes), False, 'All Ins', 'All Channels')
+        self._tracks.insert(index, track)
+        self._record_undo_step()
+        self._notify('tracks')
+        self._notify('visible_tracks')
+        return track
+
+    def create_scene(self, index):
+        _check_not_notifying()
+        return self._insert_scene(index)
+
+    def duplicate_scene(self, index):
+        _check_not_notifying()
+        scene=self._insert_scene(index+1)
+        # Live copies the scene's properties too, including its name
+        scene._name=self._scenes[index]._name
+        for track in self._tracks :
+            source=track._slots[index]
+            if source is not None and source._clip_id!=0 :
+                track._slot(index+1)._set_clip( source._new_clip_id() )
+        return scene
+
+    def delete_scene(self, index):
+        _check_not_notifying()
+        scene=self._scenes.pop(index)
+        for track in self._tracks :
+            slot=track._slots.pop(index)
+            if slot is not None and track._playing_slot is slot : track._playing_slot=None
+        self._renumber_scenes()
+        if self._view._selected_scene is scene :
+            self._view._set_selected_scene( self._scenes[min(index, len(self._scenes)-1)] )
+        self._record_undo_step()
+        self._notify('scenes')
+
+    def create_audio_track(self, index):
+        _check_not_notifying()
+        return self._insert_track(index, True)
+
+    def create_midi_track(self, index):
+        _check_not_notifying()
+        return self._insert_track(index, False)
+
+    def delete_track(self, index):
+        _check_not_notifying()
+        track=self._tracks.pop(index)
+        if self._view._selected_track is track :
+            self._view._set_selected_track( self._tracks[min(index, len(self._tracks)-1)] if self._tracks else None )
+        self._record_undo_step()
+        self._notify('tracks')
+        self._notify('visible_tracks')
+
+    def stop_playing(self):
+        _check_not_notifying()
+        self._set('is_playing', False)
+
+    def start_playing(self):
+        _check_not_notifying()
+        self._set('is_playing', True)
+
+    def stop_all_clips(self, quantized=True):
+        _check_not_notifying()
+        for track in self._tracks :
+            if track._playing_slot is not None : track._playing_slot._stop()
+
+    def begin_undo_step(self):
+        if self._undo_depth==0 : self._undo_steps+=1
+        self._undo_depth+=1
+
+    def end_undo_step(self):
+        self._undo_depth-=1
+
+    def advance(self):
+        """
+        Not part of Live's API. Simulates reaching the launch quantisation point, so that
+        every fired clip slot starts (or stops) playing or recording.
+        """
+        queue=self._launch_queue
+        self._launch_queue=[]
+        for slot in queue :
+            slot._launch()
+        if queue : self._set('is_playing', True)
+
+
+class _MidiMap(object):
+    """
+    Live.MidiMap. The midi_map_handle passed to build_midi_map is anything with a
+    forward(kind, channel, identifier) method.
+    """
+    class MapMode(object):
+        absolute=0
+        relative_signed_bit=1
+
+    @staticmethod
+    def forward_midi_note(script_handle, midi_map_handle, channel, note):
+        midi_map_handle.forward('note', channel, note)
+        return True
+
+    @staticmethod
+    def forward_midi_cc(script_handle, midi_map_handle, channel, cc, *a):
+        midi_map_handle.forward('cc', channel, cc)
+        return True
+
+    @staticmethod
+    def forward_midi_pitchbend(script_handle, midi_map_handle, channel):
+        midi_map_handle.forward('pitchbend', channel, None)
+        return True
+
+MidiMap=_MidiMap
@@ -0,0 +1,11 @@
+from _Framework.ButtonElement import ButtonElement
+from _Framework.SliderElement import SliderElement
+from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_CC_TYPE
+
+
+def make_button(channel, identifier, *a, **k):
+    return ButtonElement(True, MIDI_NOTE_TYPE, channel, identifier, *a, **k)
+
+
+def make_slider(channel, identifier, *a, **k):
+    return SliderElement(MIDI_CC_TYPE, channel, identifier, *a, **k)
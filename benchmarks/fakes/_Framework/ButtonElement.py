@@ -0,0 +1,61 @@
+from InputControlElement import InputControlElement
+
+
+class Color(object):
+
+    def __init__(self, midi_value = 0, *a, **k):
+        self.midi_value = midi_value
+
+    def __int__(self):
+        return self.midi_value
+
+    def draw(self, interface):
+        interface.send_value(self.midi_value)
+
+
+class DummyUndoStepHandler(object):
+
+    def begin_undo_step(self):
+        pass
+
+    def end_undo_step(self):
+        pass
+
+
+class ButtonValue(object):
+
+    def __init__(self, midi_value = 0, *a, **k):
+        self.midi_value = midi_value
+
+    def __int__(self):
+        return self.midi_value
+
+
+ON_VALUE = ButtonValue(127)
+OFF_VALUE = ButtonValue(0)
+
+
+class ButtonElement(InputControlElement):
+
+    def __init__(self, is_momentary, msg_type, channel, identifier, skin = None, undo_step_handler = None, *a, **k):
+        super(ButtonElement, self).__init__(msg_type, channel, identifier, *a, **k)
+        self._is_momentary = is_momentary
+        self._skin = skin
+        self._undo_step_handler = undo_step_handler
+
+    def is_momentary(self):
+        return self._is_momentary
+
+    def set_light(self, value):
+        if isinstance(value, bool):
+            value = 127 if value else 0
+        if hasattr(value, 'draw'):
+            value.draw(self)
+        else:
+            self.send_value(int(value))
+
+    def turn_on(self):
+        self.send_value(127)
+
+    def turn_off(self):
+        self.send_value(0)
@@ -0,0 +1,19 @@
+class ButtonMatrixElement(object):
+
+    def __init__(self, rows = [], name = '', *a, **k):
+        self._rows = [ list(row) for row in rows ]
+        self.name = name
+
+    def width(self):
+        return len(self._rows[0]) if self._rows else 0
+
+    def height(self):
+        return len(self._rows)
+
+    def get_button(self, column, row):
+        return self._rows[row][column]
+
+    def __iter__(self):
+        for row in self._rows:
+            for button in row:
+                yield button
@@ -0,0 +1,17 @@
+CONTROLLER_ID_KEY = 'controller_id'
+PORTS_KEY = 'ports'
+NOTES_CC = 'notes_cc'
+SCRIPT = 'script'
+REMOTE = 'remote'
+
+
+def controller_id(vendor_id, product_ids, model_name):
+    return {'vendor_id': vendor_id, 'product_ids': product_ids, 'model_name': model_name}
+
+
+def inport(props = []):
+    return {'props': props}
+
+
+def outport(props = []):
+    return {'props': props}
@@ -0,0 +1,147 @@
+from __future__ import with_statement
+from contextlib import contextmanager
+import Live
+from InputControlElement import _surface_being_built
+
+# The song of the control surface being constructed or run, for components to use
+_current_song = [None]
+
+
+class ControlSurface(object):
+    """
+    The parts of _Framework.ControlSurface.ControlSurface used by the scripts. The
+    c_instance is whatever the harness provides in place of Live's: it needs song(),
+    log_message(), show_message(), send_midi(), handle() and request_rebuild_midi_map().
+    """
+
+    def __init__(self, c_instance, *a, **k):
+        self._c_instance = c_instance
+        self._controls = []
+        self._components = []
+        self._disconnectables = []
+        self._forwarding_registry = {}
+        self._scheduled_messages = []
+        self._in_build_midi_map = False
+        _current_song[0] = c_instance.song()
+
+    def song(self):
+        return self._c_instance.song()
+
+    def application(self):
+        return None
+
+    def log_message(self, *message):
+        self._c_instance.log_message(' '.join(map(str, message)))
+
+    def show_message(self, message):
+        self._c_instance.show_message(message)
+
+    @property
+    def components(self):
+        return tuple(self._components)
+
+    @property
+    def controls(self):
+        return tuple(self._controls)
+
+    def _register_control(self, control):
+        self._controls.append(control)
+
+    def _register_component(self, component):
+        self._components.append(component)
+
+    def register_disconnectable(self, disconnectable):
+        self._disconnectables.append(disconnectable)
+        return disconnectable
+
+    def unregister_disconnectable(self, disconnectable):
+        if disconnectable in self._disconnectables:
+            self._disconnectables.remove(disconnectable)
+
+    @contextmanager
+    def component_guard(self):
+        _surface_being_built.append(self)
+        _current_song[0] = self.song()
+        try:
+            yield
+        finally:
+            _surface_being_built.pop()
+            self.request_rebuild_midi_map()
+
+    def disconnect(self):
+        for disconnectable in reversed(self._disconnectables):
+            disconnectable.disconnect()
+        self._disconnectables = []
+        for component in self._components:
+            component.disconnect()
+        for control in self._controls:
+            control.disconnect()
+
+    def connect_script_instances(self, instanciated_scripts):
+        pass
+
+    def request_rebuild_midi_map(self):
+        self._c_instance.request_rebuild_midi_map()
+
+    def build_midi_map(self, midi_map_handle):
+        self._forwarding_registry = {}
+        script_handle = self._c_instance.handle()
+        for control in self._controls:
+            for key in control.forwarding_keys():
+                self._forwarding_registry[key] = control
+                if key[0] & 240 == 176:
+                    Live.MidiMap.forward_midi_cc(script_handle, midi_map_handle, key[0] & 15, key[1])
+                else:
+                    Live.MidiMap.forward_midi_note(script_handle, midi_map_handle, key[0] & 15, key[1])
+
+    def receive_midi(self, midi_bytes):
+        if midi_bytes[0] == 240:
+            self.handle_sysex(midi_bytes)
+        else:
+            self.handle_nonsysex(midi_bytes)
+
+    def handle_sysex(self, midi_bytes):
+        pass
+
+    def handle_nonsysex(self, midi_bytes):
+        recipient = self._forwarding_registry.get(tuple(midi_bytes[:2]))
+        if recipient is not None:
+            recipient.receive_value(midi_bytes[2])
+        else:
+            self.log_message('Got unknown message: ' + str(midi_bytes))
+
+    def _send_midi(self, midi_event_bytes, optimized = None):
+        self._c_instance.send_midi(midi_event_bytes)
+        return True
+
+    def schedule_message(self, delay_in_ticks, callback, parameter = None):
+        self._scheduled_messages.append([delay_in_ticks, callback, parameter])
+
+    def update_display(self):
+        due = []
+        for message in self._scheduled_messages:
+            message[0] -= 1
+            if message[0] <= 0:
+                due.append(message)
+        for message in due:
+            self._scheduled_messages.remove(message)
+            if message[2] is None:
+                message[1]()
+            else:
+                message[1](message[2])
+
+    def refresh_state(self):
+        for component in self._components:
+            component.update()
+
+    def port_settings_changed(self):
+        self.refresh_state()
+
+    def can_lock_to_devices(self):
+        return False
+
+    def suggest_input_port(self):
+        return ''
+
+    def suggest_output_port(self):
+        return ''
@@ -0,0 +1,26 @@
+from InputControlElement import register_with_current_surface
+
+
+class ControlSurfaceComponent(object):
+
+    def __init__(self, *a, **k):
+        self._is_enabled = True
+        self.layer = None
+        register_with_current_surface('component', self)
+
+    def set_enabled(self, enable):
+        self._is_enabled = bool(enable)
+        self.update()
+
+    def is_enabled(self):
+        return self._is_enabled
+
+    def song(self):
+        from ControlSurface import _current_song
+        return _current_song[0]
+
+    def update(self):
+        pass
+
+    def disconnect(self):
+        pass
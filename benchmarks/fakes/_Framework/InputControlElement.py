@@ -0,0 +1,77 @@
+MIDI_NOTE_TYPE = 0
+MIDI_CC_TYPE = 1
+MIDI_PB_TYPE = 2
+MIDI_SYSEX_TYPE = 3
+MIDI_INVALID_TYPE = 4
+MIDI_NOTE_ON_STATUS = 144
+MIDI_NOTE_OFF_STATUS = 128
+MIDI_CC_STATUS = 176
+MIDI_PB_STATUS = 224
+
+# The control surface currently inside component_guard(). Controls and components created
+# while it's set register themselves with it, which is what the real _Framework does.
+_surface_being_built = []
+
+
+def register_with_current_surface(kind, obj):
+    if _surface_being_built:
+        getattr(_surface_being_built[-1], '_register_' + kind)(obj)
+
+
+class InputControlElement(object):
+
+    def __init__(self, msg_type, channel, identifier, name = '', *a, **k):
+        self._msg_type = msg_type
+        self._msg_channel = channel
+        self._msg_identifier = identifier
+        self._original_identifier = identifier
+        self._original_channel = channel
+        self.name = name
+        self._value_listeners = []
+        self._last_sent_value = -1
+        self.sent_values = []
+        register_with_current_surface('control', self)
+
+    def message_type(self):
+        return self._msg_type
+
+    def message_channel(self):
+        return self._msg_channel
+
+    def message_identifier(self):
+        return self._msg_identifier
+
+    def add_value_listener(self, callback, identify_sender = False):
+        self._value_listeners.append((callback, identify_sender))
+
+    def remove_value_listener(self, callback):
+        self._value_listeners = [ entry for entry in self._value_listeners if entry[0] != callback ]
+
+    def value_has_listener(self, callback):
+        return any(entry[0] == callback for entry in self._value_listeners)
+
+    def receive_value(self, value):
+        for callback, identify_sender in self._value_listeners[:]:
+            if identify_sender:
+                callback(value, self)
+            else:
+                callback(value)
+
+    def send_value(self, value, force = False, channel = None):
+        value = int(value)
+        if force or value != self._last_sent_value:
+            self._last_sent_value = value
+            self.sent_values.append(value)
+
+    def forwarding_keys(self):
+        if self._msg_type == MIDI_NOTE_TYPE:
+            return ((MIDI_NOTE_ON_STATUS + self._msg_channel, self._msg_identifier), (MIDI_NOTE_OFF_STATUS + self._msg_channel, self._msg_identifier))
+        if self._msg_type == MIDI_CC_TYPE:
+            return ((MIDI_CC_STATUS + self._msg_channel, self._msg_identifier),)
+        return ()
+
+    def install_connections(self, install_translation, install_mapping, install_forwarding):
+        pass
+
+    def disconnect(self):
+        self._value_listeners = []
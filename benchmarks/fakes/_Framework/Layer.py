@@ -0,0 +1,20 @@
+class Layer(object):
+
+    def __init__(self, priority = None, **controls):
+        self._priority = priority
+        self._controls = controls
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_controls'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class SimpleLayerOwner(object):
+
+    def __init__(self, layer = None, *a, **k):
+        self.layer = layer
+
+    def disconnect(self):
+        self.layer = None
@@ -0,0 +1,83 @@
+from ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class ChannelStripComponent(ControlSurfaceComponent):
+
+    def __init__(self, *a, **k):
+        super(ChannelStripComponent, self).__init__(*a, **k)
+        self._track = None
+        self._select_button = None
+        self._mute_button = None
+        self._arm_button = None
+
+    def set_track(self, track):
+        self._track = track
+        self.update()
+
+    def update(self):
+        track = self._track
+        if track is None:
+            for button in (self._select_button, self._mute_button, self._arm_button):
+                if button is not None:
+                    button.turn_off()
+            return
+        song = self.song()
+        if self._select_button is not None:
+            if song.view.selected_track == track:
+                self._select_button.turn_on()
+            else:
+                self._select_button.turn_off()
+        if self._mute_button is not None:
+            if track.mute:
+                self._mute_button.turn_off()
+            else:
+                self._mute_button.turn_on()
+        if self._arm_button is not None:
+            if track.can_be_armed and track.arm:
+                self._arm_button.turn_on()
+            else:
+                self._arm_button.turn_off()
+
+
+class MixerComponent(ControlSurfaceComponent):
+    """
+    A mixer that lights select, mute and arm buttons from the tracks in its region,
+    which is the part of the real MixerComponent that costs anything per refresh.
+    """
+
+    def __init__(self, num_tracks = 8, *a, **k):
+        super(MixerComponent, self).__init__(*a, **k)
+        self._channel_strips = [ ChannelStripComponent() for _ in xrange(num_tracks) ]
+        self._master_strip = ChannelStripComponent()
+        self._track_offset = 0
+
+    def channel_strip(self, index):
+        return self._channel_strips[index]
+
+    def master_strip(self):
+        return self._master_strip
+
+    def set_track_offset(self, offset):
+        self._track_offset = offset
+        self.update()
+
+    def _set_buttons(self, attribute, buttons):
+        for index, strip in enumerate(self._channel_strips):
+            setattr(strip, attribute, buttons[index] if buttons is not None and index < len(buttons) else None)
+        self.update()
+
+    def set_track_select_buttons(self, buttons):
+        self._set_buttons('_select_button', buttons)
+
+    def set_mute_buttons(self, buttons):
+        self._set_buttons('_mute_button', buttons)
+
+    def set_arm_buttons(self, buttons):
+        self._set_buttons('_arm_button', buttons)
+
+    def update(self):
+        tracks = self.song().tracks
+        for index, strip in enumerate(self._channel_strips):
+            trackIndex = self._track_offset + index
+            strip._track = tracks[trackIndex] if trackIndex < len(tracks) else None
+            strip.update()
@@ -0,0 +1,51 @@
+from ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class SessionComponent(ControlSurfaceComponent):
+    """
+    Just the offset part of the session component: the highlighted region a control
+    surface shows, with offset listeners like the real one.
+    """
+
+    def __init__(self, num_tracks = 0, num_scenes = 0, *a, **k):
+        super(SessionComponent, self).__init__(*a, **k)
+        self._num_tracks = num_tracks
+        self._num_scenes = num_scenes
+        self._track_offset = 0
+        self._scene_offset = 0
+        self._offset_listeners = []
+
+    def width(self):
+        return self._num_tracks
+
+    def height(self):
+        return self._num_scenes
+
+    def track_offset(self):
+        return self._track_offset
+
+    def scene_offset(self):
+        return self._scene_offset
+
+    def set_offsets(self, track_offset, scene_offset):
+        if (track_offset, scene_offset) == (self._track_offset, self._scene_offset):
+            return
+        self._track_offset = track_offset
+        self._scene_offset = scene_offset
+        self.notify_offset()
+
+    def add_offset_listener(self, callback):
+        self._offset_listeners.append(callback)
+
+    def remove_offset_listener(self, callback):
+        self._offset_listeners.remove(callback)
+
+    def offset_has_listener(self, callback):
+        return callback in self._offset_listeners
+
+    def notify_offset(self):
+        for callback in self._offset_listeners[:]:
+            callback()
+
+    def disconnect(self):
+        self._offset_listeners = []
@@ -0,0 +1,4 @@
+class Skin(object):
+
+    def __init__(self, colors = None, *a, **k):
+        self._colors = colors
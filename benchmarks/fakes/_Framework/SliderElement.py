@@ -0,0 +1,7 @@
+from InputControlElement import InputControlElement
+
+
+class SliderElement(InputControlElement):
+
+    def __init__(self, msg_type, channel, identifier, *a, **k):
+        super(SliderElement, self).__init__(msg_type, channel, identifier, *a, **k)
@@ -0,0 +1,4 @@
+"""
+Minimal stand-ins for the classes in Live's _Framework package that the scripts in
+this repository use. Only enough behaviour is provided to run the scripts headless.
+"""
@@ -0,0 +1,148 @@
+"""
+Runs the control surface scripts against the fake Live in benchmarks/fakes. Importing
+this module puts the fakes and the repository root on sys.path, so the scripts can be
+imported in the normal way afterwards.
+"""
+import os
+import random
+import sys
+from collections import deque
+
+BENCHMARK_DIR=os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIR=os.path.dirname(BENCHMARK_DIR)
+for path in (REPOSITORY_DIR, os.path.join(BENCHMARK_DIR, 'fakes')) :
+    if path not in sys.path : sys.path.insert(0, path)
+
+import Live
+
+
+class MidiMapHandle(object):
+    """
+    Stands in for the midi map handle Live passes to build_midi_map, and remembers what
+    the script asked to have forwarded to it.
+    """
+    def __init__(self):
+        self.forwarded=set()
+
+    def forward(self, kind, channel, identifier):
+        self.forwarded.add( (kind, channel, identifier) )
+
+
+class FakeCInstance(object):
+    """
+    Stands in for the c_instance Live passes to create_instance().
+    """
+    def __init__(self, song):
+        self._song=song
+        self.log=deque(maxlen=1000)
+        self.messages=[]
+        self.midi_sent=0
+        self.needs_midi_map=False
+
+    def song(self):
+        return self._song
+
+    def handle(self):
+        return id(self)
+
+    def log_message(self, message):
+        self.log.append(message)
+
+    def show_message(self, message):
+        self.messages.append(message)
+
+    def send_midi(self, midi_bytes):
+        self.midi_sent+=1
+
+    def request_rebuild_midi_map(self):
+        self.needs_midi_map=True
+
+
+class ScriptHarness(object):
+    """
+    Creates a script the way Live would and passes MIDI to it, dropping anything the
+    script hasn't asked to have forwarded just like Live does.
+    """
+    def __init__(self, create_instance, song):
+        self.song=song
+        self.c_instance=FakeCInstance(song)
+        self.script=create_instance(self.c_instance)
+        self.midi_map=MidiMapHandle()
+        self.rebuild_midi_map_if_needed()
+        self.script.connect_script_instances( [self.script] )
+
+    def rebuild_midi_map_if_needed(self):
+        if not self.c_instance.needs_midi_map : return
+        self.c_instance.needs_midi_map=False
+        self.midi_map=MidiMapHandle()
+        self.script.build_midi_map(self.midi_map)
+
+    def is_forwarded(self, midi_bytes):
+        status=midi_bytes[0]&0xF0
+        channel=midi_bytes[0]&0x0F
+        if status in (0x80,0x90) : return ('note', channel, midi_bytes[1]) in self.midi_map.forwarded
+        if status==0xB0 : return ('cc', channel, midi_bytes[1]) in self.midi_map.forwarded
+        if status==0xE0 : return ('pitchbend', channel, None) in self.midi_map.forwarded
+        return midi_bytes[0]==0xF0
+
+    def send(self, *midi_bytes):
+        if self.is_forwarded(midi_bytes) :
+            self.script.receive_midi(midi_bytes)
+            return True
+        return False
+
+    def press(self, note, channel=0, velocity=100):
+        self.send(0x90|channel, note, velocity)
+
+    def release(self, note, channel=0):
+        self.send(0x80|channel, note, 0)
+
+    def tick(self):
+        """
+        One display refresh: clips launch at the quantisation point, then Live calls
+        update_display.
+        """
+        self.song.advance()
+        self.script.update_display()
+        self.rebuild_midi_map_if_needed()
+
+    def disconnect(self):
+        self.script.disconnect()
+
+
+class VirtualClock(object):
+    """
+    Stands in for time.time so that timed behaviour in the scripts, such as pedal gestures
+    and debouncing, sees simulated time however fast the script is driven.
+    """
+    def __init__(self, start):
+        self.now=start
+
+    def __call__(self):
+        return self.now
+
+
+INPUTS=[('Ext. In', str(index)) for index in xrange(1,5)]
+
+def build_song(numberOfTracks, numberOfScenes, seed=0):
+    """
+    A synthetic set: tracks cycle through four inputs, roughly half the slots in the
+    first half of the scenes have clips, one track in eight is armed and the selected
+    scene is in the middle.
+    """
+    generator=random.Random(seed)
+    song=Live.Song()
+    for index in xrange(numberOfScenes) :
+        song._insert_scene(index)
+    for index in xrange(numberOfTracks) :
+        routing,subRouting=INPUTS[index%len(INPUTS)]
+        track=Live.Track(song, '%d Audio' % (index+1), numberOfScenes, True, routing, subRouting)
+        song._tracks.append(track)
+        for sceneIndex in xrange( (numberOfScenes+1)//2 ) :
+            if generator.random()<0.5 :
+                track._slot(sceneIndex)._clip_id=track._slot(sceneIndex)._new_clip_id()
+        track._arm=(index%8==0)
+    song._view._selected_scene=song._scenes[ numberOfScenes//2 ]
+    song._view._selected_track=song._tracks[0] if song._tracks else None
+    song._undo_steps=0
+    return song
@@ -0,0 +1,163 @@
+"""
+Replays a MIDI trace recorded by a script's MIDI_TRACE_FILE against a synthetic set on the
+fake Live in benchmarks/fakes, as fast as possible.
+
+    python2 benchmarks/replay_trace.py trace.midt [--size 64] [--golden state.json] [--write-golden state.json]
+
+The time spent handling every message is reported, along with the slowest messages. Time
+passes as it did when the trace was recorded as far as the script can tell: display ticks
+are run for every 100ms between messages and scheduled work such as pedal gestures sees the
+recorded times. The song state at the end can be saved with --write-golden and compared
+with a later run with --golden, which lists every difference and exits with status 1.
+"""
+from __future__ import with_statement
+import argparse
+import json
+import sys
+
+import harness
+import Live
+from run_benchmarks import Samples, clock
+from _Trace.MidiTrace import read_trace
+
+TICK_INTERVAL = 0.1 # Live calls update_display about every 100ms
+SLOWEST_SHOWN = 10
+
+
+def create_function(scriptName):
+    """
+    Returns the create_instance function of the script that recorded the trace.
+    """
+    if scriptName=='BehringerFCB1010' :
+        import BehringerFCB1010
+        return BehringerFCB1010.create_instance
+    if scriptName=='CustomAPC_mini' :
+        import CustomAPC_mini
+        return CustomAPC_mini.create_instance
+    raise ValueError("Don't know how to replay a trace from '%s'" % scriptName)
+
+
+def replay(trace, size, seed):
+    """
+    Sends every message in the trace to a new instance of the script that recorded it. Returns
+    the harness, the Samples for the handlers and the Samples for the display ticks, plus a list
+    of (seconds spent handling it, event index, MIDI bytes) for every message.
+    """
+    (scriptName,startTime,events)=trace
+    surface=harness.ScriptHarness( create_function(scriptName), harness.build_song(size,size,seed) )
+    virtualClock=harness.VirtualClock(startTime)
+    scheduler=getattr(surface.script, '_scheduler', None)
+    if scheduler is not None : scheduler.clock=virtualClock
+
+    handlers=Samples('MIDI handlers')
+    ticks=Samples('update_display')
+    timings=[]
+    nextTick=startTime+TICK_INTERVAL
+    for (index,(seconds,midi_bytes)) in enumerate(events) :
+        eventTime=startTime+seconds
+        while nextTick<=eventTime :
+            virtualClock.now=nextTick
+            surface.song.advance()
+            Live.ACCESS_COUNTER.reset()
+            start=clock()
+            surface.script.update_display()
+            ticks.add( clock()-start, Live.ACCESS_COUNTER.reset() )
+            nextTick+=TICK_INTERVAL
+        virtualClock.now=eventTime
+        Live.ACCESS_COUNTER.reset()
+        start=clock()
+        surface.send(*midi_bytes)
+        elapsed=clock()-start
+        handlers.add( elapsed, Live.ACCESS_COUNTER.reset() )
+        timings.append( (elapsed, index, midi_bytes) )
+        surface.rebuild_midi_map_if_needed()
+    # One more tick so anything waiting for update_display is finished
+    virtualClock.now=nextTick
+    surface.tick()
+    return (surface, handlers, ticks, timings)
+
+
+def song_state(song):
+    """
+    The parts of the song the scripts change, as something that can be saved as JSON.
+    """
+    view=song.view
+    scenes=list(song.scenes)
+    tracks=list(song.tracks)
+    state={ 'is_playing' : song.is_playing,
+            'metronome' : song.metronome,
+            'number_of_scenes' : len(scenes),
+            'selected_scene' : scenes.index(view.selected_scene) if view.selected_scene in scenes else None,
+            'selected_track' : tracks.index(view.selected_track) if view.selected_track in tracks else None,
+            'tracks' : [] }
+    for track in tracks :
+        slots=[]
+        for slot in track.clip_slots :
+            slots.append( [ int(slot.has_clip), int(slot.is_playing), int(slot.is_recording), int(slot.is_triggered) ] )
+        state['tracks'].append( { 'name' : track.name,
+                                  'arm' : track.arm,
+                                  'volume' : round(track.mixer_device.volume.value, 6),
+                                  'clip_slots (has_clip, is_playing, is_recording, is_triggered)' : slots } )
+    return state
+
+
+def differences(golden, state, path='song'):
+    """
+    Yields a description of everything that's different between two song states.
+    """
+    if isinstance(golden, dict) and isinstance(state, dict) :
+        for key in sorted( set(golden)|set(state) ) :
+            if key not in state : yield "%s.%s missing, golden has %r" % (path,key,golden[key])
+            elif key not in golden : yield "%s.%s is %r, not in golden" % (path,key,state[key])
+            else :
+                for difference in differences(golden[key], state[key], "%s.%s" % (path,key)) : yield difference
+    elif isinstance(golden, list) and isinstance(state, list) and len(golden)==len(state) :
+        for index in xrange( len(golden) ) :
+            for difference in differences(golden[index], state[index], "%s[%d]" % (path,index)) : yield difference
+    elif golden!=state :
+        yield "%s is %r, golden has %r" % (path,state,golden)
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('trace', help='trace file written by MIDI_TRACE_FILE')
+    parser.add_argument('--size', type=int, default=64, help='number of tracks (and scenes) in the synthetic set')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic set')
+    parser.add_argument('--golden', help='song state JSON from an earlier run to compare the result with')
+    parser.add_argument('--write-golden', help='file to save the resulting song state to')
+    arguments=parser.parse_args()
+
+    trace=read_trace(arguments.trace)
+    print "Replaying %d messages from %s recorded over %.1f seconds" % (len(trace[2]), trace[0], trace[2][-1][0] if trace[2] else 0)
+    start=clock()
+    (surface,handlers,ticks,timings)=replay(trace, arguments.size, arguments.seed)
+    total=clock()-start
+
+    print "%6s  %-28s %5s %9s %9s %9s %9s %10s" % ('size', 'handler', 'n', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'API/press')
+    for samples in (handlers, ticks) :
+        if samples.times : print samples.row(arguments.size)
+    print "Total replay time %.3f s, of which %.3f s in MIDI handlers and %.3f s in update_display" % (total, sum(handlers.times), sum(ticks.times))
+    print "Slowest messages:"
+    for (elapsed,index,midi_bytes) in sorted(timings, reverse=True)[:SLOWEST_SHOWN] :
+        print "    %9.3f ms  event %d at %.3f s  %s" % (1000*elapsed, index, trace[2][index][0], ' '.join('%02X' % byte for byte in midi_bytes))
+
+    state=song_state(surface.song)
+    surface.disconnect()
+    if arguments.write_golden :
+        with open(arguments.write_golden, 'w') as goldenFile :
+            json.dump(state, goldenFile, indent=1, sort_keys=True)
+    if arguments.golden :
+        with open(arguments.golden) as goldenFile :
+            golden=json.load(goldenFile)
+        # Round trip through JSON so that tuples and strings compare the same way
+        found=list( differences(golden, json.loads(json.dumps(state))) )
+        for difference in found :
+            print difference
+        if found :
+            print "%d differences from %s" % (len(found), arguments.golden)
+            sys.exit(1)
+        print "Song state matches %s" % arguments.golden
+
+
+if __name__=='__main__' :
+    main()
@@ -0,0 +1,162 @@
+"""
+Times the BehringerFCB1010 pedal handlers and the CustomAPC_mini mixer and session
+setup against synthetic sets run on the fake Live in benchmarks/fakes.
+
+    python2 benchmarks/run_benchmarks.py [--sizes 8,64,256,1024] [--presses 30]
+
+Each size N is a set of N tracks by N scenes. For every handler the per-press latency
+percentiles are reported along with the mean number of Live API attribute accesses.
+"""
+from __future__ import with_statement
+import argparse
+import timeit
+
+import harness
+import Live
+from _Framework.InputControlElement import MIDI_CC_TYPE
+import BehringerFCB1010
+import CustomAPC_mini
+
+clock=timeit.default_timer
+# How long, in simulated seconds, each pedal is held down and the gap between presses. Long
+# enough that the script's debouncing lets every press through as a separate tap.
+PRESS_LENGTH = 0.2
+PRESS_INTERVAL = 1.0
+# How many values an expression pedal sweep sends before the display tick that writes them
+SWEEP_LENGTH = 32
+
+
+class Samples(object):
+    def __init__(self, name):
+        self.name=name
+        self.times=[]
+        self.accesses=[]
+
+    def add(self, seconds, accesses):
+        self.times.append(seconds)
+        self.accesses.append(accesses)
+
+    def percentile(self, fraction):
+        ordered=sorted(self.times)
+        return ordered[ min(len(ordered)-1, int(fraction*len(ordered))) ]
+
+    def row(self, size):
+        return "%6d  %-28s %5d %9.3f %9.3f %9.3f %9.3f %10.1f" % (size, self.name, len(self.times),
+            1000*self.percentile(0.5), 1000*self.percentile(0.9), 1000*self.percentile(0.99),
+            1000*max(self.times), float(sum(self.accesses))/len(self.accesses))
+
+
+def timed(samples, function, *a):
+    Live.ACCESS_COUNTER.reset()
+    start=clock()
+    function(*a)
+    samples.add( clock()-start, Live.ACCESS_COUNTER.reset() )
+
+
+def pedal_notes(script):
+    """
+    The (name, message, how) to time for each FCB1010 pedal action, where how is 'tap' for a
+    press and release, 'hold' to keep the pedal down until the hold action has run, and
+    'sweep' to move an expression pedal and then tick.
+    """
+    return [ ('begin_recording', script.BEGIN_RECORDING_MIDI_NOTES[0], 'tap'),
+             ('begin_new_scene', script.BEGIN_NEW_SCENE_MIDI_NOTES[0], 'tap'),
+             ('begin_new_layer', script.BEGIN_NEW_LAYER_MIDI_NOTES[0], 'tap'),
+             ('stop_song', script.STOP_SONG_MIDI_NOTES[0], 'tap'),
+             ('toggle_metronome', script.TOGGLE_METRONOME_MIDI_NOTES[0], 'tap'),
+             ('fire_scene', script.FIRE_SCENE_MIDI_NOTES[0], 'tap'),
+             ('fire_clip', script.FIRE_CLIP_MIDI_NOTES[0], 'tap'),
+             ('delete_clip (hold)', script.FIRE_CLIP_MIDI_NOTES[0], 'hold'),
+             ('change_bank', script.BANK_UP_MIDI_NOTES[0], 'tap'),
+             ('expression_pedal (+tick)', (MIDI_CC_TYPE, script.MIDI_CHANNEL, script.EXPRESSION_MIDI_CC[0]), 'sweep') ]
+
+
+def benchmark_fcb1010(size, presses):
+    results=[]
+    # The notes come from the mapping file, which the script loads when it's created
+    probe=harness.ScriptHarness( BehringerFCB1010.create_instance, harness.build_song(1,1) )
+    pedals=pedal_notes(probe.script)
+    layerNote=probe.script.BEGIN_NEW_LAYER_MIDI_NOTES[0]
+    probe.disconnect()
+    for (name,(msgType,channel,note),how) in pedals :
+        fcb=harness.ScriptHarness( BehringerFCB1010.create_instance, harness.build_song(size,size) )
+        virtualClock=harness.VirtualClock(0.0)
+        fcb.script._scheduler.clock=virtualClock
+        samples=Samples(name)
+        def press():
+            fcb.press(note, channel)
+            virtualClock.now+=PRESS_LENGTH
+            fcb.release(note, channel)
+        def hold():
+            fcb.press(note, channel)
+            virtualClock.now+=fcb.script.HOLD_TIME
+            fcb.script._scheduler.run_due()
+            fcb.release(note, channel)
+        def sweep():
+            for value in xrange(SWEEP_LENGTH) :
+                fcb.send(0xB0|channel, note, value*127//(SWEEP_LENGTH-1))
+            fcb.script.update_display()
+        for _ in xrange(presses) :
+            if how=='hold' :
+                # Put back the clip the last hold deleted, so there's always one to delete
+                slot=fcb.script._clip_slot( fcb.script._pressed_clip_slot(0) )
+                if not slot.has_clip : slot._set_clip( slot._new_clip_id() )
+                timed(samples, hold)
+            elif how=='sweep' :
+                timed(samples, sweep)
+            else :
+                timed(samples, press)
+            virtualClock.now+=PRESS_INTERVAL
+            fcb.tick()
+        fcb.disconnect()
+        results.append(samples)
+
+    # The display tick on its own, both with nothing to do and straight after new layers
+    fcb=harness.ScriptHarness( BehringerFCB1010.create_instance, harness.build_song(size,size) )
+    virtualClock=harness.VirtualClock(0.0)
+    fcb.script._scheduler.clock=virtualClock
+    idle=Samples('update_display (idle)')
+    busy=Samples('update_display (after layer)')
+    for _ in xrange(presses) :
+        fcb.song.advance()
+        timed(idle, fcb.script.update_display)
+        fcb.press(layerNote[2], layerNote[1])
+        virtualClock.now+=PRESS_LENGTH
+        fcb.release(layerNote[2], layerNote[1])
+        virtualClock.now+=PRESS_INTERVAL
+        fcb.song.advance()
+        timed(busy, fcb.script.update_display)
+        fcb.rebuild_midi_map_if_needed()
+    fcb.disconnect()
+    results.extend( [idle,busy] )
+    return results
+
+
+def benchmark_apc_mini(size, repeats):
+    setup=Samples('apc_mini setup')
+    refresh=Samples('apc_mini refresh_state')
+    for _ in xrange(repeats) :
+        song=harness.build_song(size,size)
+        apc=[None]
+        def create():
+            apc[0]=harness.ScriptHarness( CustomAPC_mini.create_instance, song )
+        timed(setup, create)
+        timed(refresh, apc[0].script.refresh_state)
+        apc[0].disconnect()
+    return [setup,refresh]
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='8,64,256,1024', help='comma separated numbers of tracks (and scenes)')
+    parser.add_argument('--presses', type=int, default=30, help='presses timed per handler')
+    arguments=parser.parse_args()
+
+    print "%6s  %-28s %5s %9s %9s %9s %9s %10s" % ('size', 'handler', 'n', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'API/press')
+    for size in [ int(size) for size in arguments.sizes.split(',') ] :
+        for samples in benchmark_fcb1010(size, arguments.presses)+benchmark_apc_mini(size, max(1,arguments.presses//10)) :
+            print samples.row(size)
+
+
+if __name__=='__main__' :
+    main()
@@ -0,0 +1,87 @@
+"""
+Behaviour of BehringerFCB1010's clip pedals on the fake Live in benchmarks/fakes.
+
+    python2 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import harness
+import Live
+import BehringerFCB1010
+
+
+class TestClipPedals(unittest.TestCase):
+    def setUp(self):
+        self.song=harness.build_song(8, 6)
+        self.song._view._selected_scene=self.song._scenes[3]
+        for sceneIndex in (2,3) :
+            slot=self.song._tracks[0]._slot(sceneIndex)
+            slot._set_clip( slot._new_clip_id() )
+        self.fcb=harness.ScriptHarness(BehringerFCB1010.create_instance, self.song)
+        self.clock=harness.VirtualClock(0.0)
+        self.fcb.script._scheduler.clock=self.clock
+        # The first clip pedal, which works on the first track in the session box
+        self.clipNote=[ message for (message,action,argument,gesture) in self.fcb.script.BANKS[0] if action=='fire_clip' and argument==0 ][0]
+
+    def tearDown(self):
+        self.fcb.disconnect()
+
+    def slot(self, sceneIndex):
+        return self.song._tracks[0]._slot(sceneIndex)
+
+    def test_hold_deletes_clip_selected_at_press(self):
+        self.fcb.press(self.clipNote[2], self.clipNote[1])
+        self.clock.now+=0.5
+        self.fcb.tick()
+        # Move the selection before the hold time is up
+        self.song.view.selected_scene=self.song._scenes[2]
+        self.clock.now+=2.0
+        self.fcb.tick()
+        self.assertFalse( self.slot(3).has_clip )
+        self.assertTrue( self.slot(2).has_clip )
+        self.fcb.release(self.clipNote[2], self.clipNote[1])
+        self.assertFalse( self.slot(2).is_triggered )
+
+    def test_hold_follows_track_inserted_before_it(self):
+        tracks=self.song._tracks
+        for trackIndex in (1,2) :
+            slot=tracks[trackIndex]._slot(3)
+            slot._set_clip( slot._new_clip_id() )
+        (secondTrack,thirdTrack)=(tracks[1],tracks[2])
+        # The third clip pedal works on the third track
+        note=[ message for (message,action,argument,gesture) in self.fcb.script.BANKS[0] if action=='fire_clip' and argument==2 ][0]
+        self.fcb.press(note[2], note[1])
+        self.clock.now+=0.5
+        self.song.create_audio_track(0)
+        self.clock.now+=2.0
+        self.fcb.tick()
+        self.assertFalse( thirdTrack._slot(3).has_clip )
+        self.assertTrue( secondTrack._slot(3).has_clip )
+        self.fcb.release(note[2], note[1])
+
+    def test_hold_does_nothing_if_track_deleted(self):
+        for track in self.song._tracks :
+            if not track._slot(3).has_clip : track._slot(3)._set_clip( track._slot(3)._new_clip_id() )
+        self.fcb.press(self.clipNote[2], self.clipNote[1])
+        self.clock.now+=0.5
+        self.song.delete_track(0)
+        clips=[ track._slot(3).has_clip for track in self.song._tracks ]
+        self.clock.now+=2.0
+        self.fcb.tick()
+        self.assertEqual( [ track._slot(3).has_clip for track in self.song._tracks ], clips )
+        self.fcb.release(self.clipNote[2], self.clipNote[1])
+
+    def test_tap_fires_clip_selected_at_press(self):
+        self.fcb.press(self.clipNote[2], self.clipNote[1])
+        self.clock.now+=0.2
+        self.song.view.selected_scene=self.song._scenes[2]
+        self.fcb.release(self.clipNote[2], self.clipNote[1])
+        self.assertTrue( self.slot(3).is_triggered )
+        self.assertFalse( self.slot(2).is_triggered )
+
+
+if __name__=='__main__' :
+    unittest.main()
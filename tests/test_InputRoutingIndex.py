@@ -0,0 +1,114 @@
+"""
+Behaviour of BehringerFCB1010's InputRoutingIndex on the fake Live in benchmarks/fakes.
+
+    python2 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import harness
+import Live
+import BehringerFCB1010
+from BehringerFCB1010.InputRoutingIndex import InputRoutingIndex
+
+
+def empty_song(numberOfTracks, numberOfScenes=2):
+    """
+    A set with no clips, where the tracks cycle through inputs 1 to 4 like harness.build_song.
+    """
+    song=harness.build_song(numberOfTracks, numberOfScenes)
+    for track in song._tracks :
+        for slot in track._slots :
+            if slot is not None : slot._clip_id=0
+    return song
+
+def selected_slot(song, trackIndex):
+    return song._tracks[trackIndex]._slot( song._scenes.index(song._view._selected_scene) )
+
+
+class TestInputRoutingIndex(unittest.TestCase):
+    def setUp(self):
+        self.song=empty_song(12)
+        self.index=InputRoutingIndex(self.song)
+
+    def tearDown(self):
+        self.index.disconnect()
+
+    def test_finds_next_track_with_same_input(self):
+        # Tracks 0, 4 and 8 share input 1
+        self.assertEqual(self.index.next_empty_track(0), 4)
+        self.assertEqual(self.index.next_empty_track(4), 8)
+
+    def test_loops_around_at_the_end(self):
+        self.assertEqual(self.index.next_empty_track(8), 0)
+
+    def test_never_returns_the_track_itself(self):
+        song=empty_song(2)
+        index=InputRoutingIndex(song)
+        self.assertEqual(index.next_empty_track(0), None)
+        index.disconnect()
+
+    def test_skips_excluded_tracks(self):
+        self.assertEqual(self.index.next_empty_track(0, set([4])), 8)
+        self.assertEqual(self.index.next_empty_track(0, set([4,8])), None)
+
+    def test_exclude_does_not_change_the_index(self):
+        self.index.next_empty_track(0, set([4]))
+        self.assertEqual(self.index.next_empty_track(0), 4)
+
+    def test_follows_new_clips(self):
+        self.index.next_empty_track(0)
+        selected_slot(self.song, 4)._set_clip( selected_slot(self.song, 4)._new_clip_id() )
+        self.assertEqual(self.index.next_empty_track(0), 8)
+        selected_slot(self.song, 4).delete_clip()
+        self.assertEqual(self.index.next_empty_track(0), 4)
+
+    def test_follows_routing_changes(self):
+        self.index.next_empty_track(0)
+        self.song._tracks[5].current_input_sub_routing='1'
+        self.assertEqual(self.index.next_empty_track(0), 4)
+        self.assertEqual(self.index.next_empty_track(4), 5)
+
+    def test_rebuilds_when_the_selected_scene_changes(self):
+        self.index.next_empty_track(0)
+        otherScene=self.song._scenes[0] if self.song._view._selected_scene is not self.song._scenes[0] else self.song._scenes[1]
+        self.song._tracks[4]._slot( self.song._scenes.index(otherScene) )._clip_id=99
+        self.song.view.selected_scene=otherScene
+        self.assertEqual(self.index.next_empty_track(0), 8)
+
+
+class TestNewLayerReusesTracks(unittest.TestCase):
+    def test_cancelled_launch_leaves_track_free(self):
+        # Only track 0 is armed, and has a clip, so a new layer goes onto track 4
+        song=empty_song(8)
+        for track in song._tracks :
+            track._arm=False
+        song._tracks[0]._arm=True
+        slot=selected_slot(song, 0)
+        slot._set_clip( slot._new_clip_id() )
+        fcb=harness.ScriptHarness(BehringerFCB1010.create_instance, song)
+        layerNote=fcb.script.BEGIN_NEW_LAYER_MIDI_NOTES[0]
+        fcb.script._scheduler.clock=harness.VirtualClock(0.0)
+
+        fcb.press(layerNote[2], layerNote[1])
+        fcb.release(layerNote[2], layerNote[1])
+        self.assertTrue( selected_slot(song, 4).is_triggered )
+        # Cancel the launch before the quantisation point, and arm track 0 again once it's
+        # been disarmed
+        selected_slot(song, 4).stop()
+        fcb.script._scheduler.clock.now+=1.0
+        fcb.tick()
+        song._tracks[4].arm=False
+        song._tracks[0].arm=True
+        fcb.script._scheduler.clock.now+=1.0
+        fcb.press(layerNote[2], layerNote[1])
+        fcb.release(layerNote[2], layerNote[1])
+        self.assertEqual( len(song.tracks), 8 )
+        self.assertTrue( selected_slot(song, 4).is_triggered )
+        fcb.disconnect()
+
+
+if __name__=='__main__' :
+    unittest.main()
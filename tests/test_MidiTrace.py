@@ -0,0 +1,73 @@
+"""
+Writing and reading the MIDI traces in _Trace.MidiTrace.
+
+    python2 -m unittest discover tests
+"""
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _Trace import MidiTrace
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now=1000.0
+    def __call__(self):
+        return self.now
+
+
+class TestMidiTrace(unittest.TestCase):
+    def setUp(self):
+        self.directory=tempfile.mkdtemp()
+        self.path=os.path.join(self.directory, 'trace.midt')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip_with_long_sysex(self):
+        clock=FakeClock()
+        writer=MidiTrace.MidiTraceWriter(self.path, 'BehringerFCB1010', clock)
+        sysex=tuple( [0xF0]+[0x01]*300+[0xF7] )
+        messages=[ (0.0, (0x90, 16, 100)), (0.25, sysex), (0.5, (0x80, 16, 0)) ]
+        for (seconds,midi_bytes) in messages :
+            clock.now=1000.0+seconds
+            writer.record(midi_bytes)
+        writer.disconnect()
+        (scriptName,startTime,events)=MidiTrace.read_trace(self.path)
+        self.assertEqual( scriptName, 'BehringerFCB1010' )
+        self.assertEqual( startTime, 1000.0 )
+        self.assertEqual( [ midi_bytes for (seconds,midi_bytes) in events ], [ midi_bytes for (seconds,midi_bytes) in messages ] )
+        for ((seconds,midi_bytes),(expected,_)) in zip(events, messages) :
+            self.assertAlmostEqual( seconds, expected, places=5 )
+
+    def test_too_long_is_skipped(self):
+        writer=MidiTrace.MidiTraceWriter(self.path, 'CustomAPC_mini', FakeClock())
+        writer.record( tuple( [0xF0]+[0x01]*(MidiTrace.MAX_LENGTH)+[0xF7] ) )
+        writer.record( (0x90, 1, 127) )
+        writer.disconnect()
+        self.assertEqual( (writer.recorded, writer.skipped), (1, 1) )
+        self.assertEqual( MidiTrace.read_trace(self.path)[2], [ (0.0, (0x90, 1, 127)) ] )
+
+    def test_reads_version_1(self):
+        with open(self.path, 'wb') as traceFile :
+            traceFile.write( MidiTrace.HEADER.pack(MidiTrace.MAGIC, 1, 500.0, 1)+'X' )
+            traceFile.write( struct.pack('<IB', 2000, 3)+struct.pack('3B', 0x90, 16, 100) )
+            traceFile.write( struct.pack('<IB', 1000, 3)+struct.pack('3B', 0x80, 16, 0) )
+        (scriptName,startTime,events)=MidiTrace.read_trace(self.path)
+        self.assertEqual( (scriptName,startTime), ('X', 500.0) )
+        self.assertEqual( [ midi_bytes for (seconds,midi_bytes) in events ], [ (0x90, 16, 100), (0x80, 16, 0) ] )
+        self.assertAlmostEqual( events[1][0], 0.003 )
+
+    def test_rejects_unknown_version(self):
+        with open(self.path, 'wb') as traceFile :
+            traceFile.write( MidiTrace.HEADER.pack(MidiTrace.MAGIC, MidiTrace.VERSION+1, 0.0, 0) )
+        self.assertRaises( ValueError, MidiTrace.read_trace, self.path )
+
+
+if __name__=='__main__' :
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Behaviour of BehringerFCB1010's new scene pedal on the fake Live in benchmarks/fakes.
+
+    python2 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import harness
+import BehringerFCB1010
+
+
+class TestNewScene(unittest.TestCase):
+    def new_scene(self, clipTracks):
+        """
+        Presses the new scene pedal with only track 0 armed and clips on clipTracks in the
+        selected scene, which is named "120 BPM". Returns the new scene.
+        """
+        song=harness.build_song(8, 2)
+        sceneIndex=song._scenes.index(song._view._selected_scene)
+        song._scenes[sceneIndex]._name='120 BPM'
+        for trackIndex in xrange( len(song._tracks) ) :
+            track=song._tracks[trackIndex]
+            track._arm=(trackIndex==0)
+            slot=track._slot(sceneIndex)
+            slot._set_clip( slot._new_clip_id() if trackIndex in clipTracks else 0 )
+        fcb=harness.ScriptHarness(BehringerFCB1010.create_instance, song)
+        (msgType,channel,note)=fcb.script.BEGIN_NEW_SCENE_MIDI_NOTES[0]
+        fcb.press(note, channel)
+        fcb.release(note, channel)
+        fcb.disconnect()
+        self.assertEqual( len(song.scenes), 3 )
+        return song.scenes[sceneIndex+1]
+
+    def test_copied_scene_is_blank_like_a_new_one(self):
+        # Copying most of the clips duplicates the scene, copying none creates an empty one
+        duplicated=self.new_scene( range(1,8) )
+        created=self.new_scene( [] )
+        self.assertEqual( duplicated.name, created.name )
+        self.assertEqual( duplicated.name, '' )
+
+
+if __name__=='__main__' :
+    unittest.main()
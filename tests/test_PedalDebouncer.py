@@ -0,0 +1,86 @@
+"""
+Behaviour of BehringerFCB1010's PedalDebouncer, timed with a virtual clock.
+
+    python2 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import harness
+import BehringerFCB1010
+from BehringerFCB1010.PedalDebouncer import PedalDebouncer
+from BehringerFCB1010.DeadlineScheduler import DeadlineScheduler
+
+PRESS = (0x90, 16, 100)
+RELEASE = (0x80, 16, 0)
+
+
+class TestPedalDebouncer(unittest.TestCase):
+    def setUp(self):
+        self.clock=harness.VirtualClock(0.0)
+        self.scheduler=DeadlineScheduler(self.clock)
+        self.handledNotes=set([16])
+        self.delivered=[]
+        self.unhandled=[]
+        self.debouncer=PedalDebouncer(self.scheduler, self.deliver, 0.05, self.accepts, self.unhandled.append)
+
+    def deliver(self, midi_bytes):
+        self.delivered.append(midi_bytes)
+        return midi_bytes[1] in self.handledNotes
+
+    def accepts(self, midi_bytes):
+        return midi_bytes[1] in self.handledNotes
+
+    def at(self, seconds, midi_bytes=None):
+        self.clock.now=seconds
+        self.scheduler.run_due()
+        if midi_bytes is not None : return self.debouncer.receive(midi_bytes)
+
+    def test_bounce_is_one_press(self):
+        self.at(0.0, PRESS)
+        self.at(0.01, RELEASE)
+        self.at(0.02, PRESS)
+        self.at(0.1)
+        self.assertEqual( self.delivered, [PRESS] )
+
+    def test_notes_not_accepted_pass_straight_through(self):
+        other=(0x90, 17, 100)
+        self.assertFalse( self.at(0.0, other) )
+        self.assertFalse( self.at(0.01, other) )
+        self.assertEqual( self.delivered, [other, other] )
+
+    def test_late_settle_does_not_swallow_next_press(self):
+        self.at(0.0, PRESS)
+        self.at(0.01, RELEASE)
+        # The deadline isn't checked until well after the window
+        self.at(0.2)
+        self.at(0.21, PRESS)
+        self.assertEqual( self.delivered, [PRESS, RELEASE, PRESS] )
+
+    def test_unhandled_late_delivery_falls_through(self):
+        self.at(0.0, PRESS)
+        self.at(0.01, RELEASE)
+        self.handledNotes.clear()
+        self.at(0.1)
+        self.assertEqual( self.unhandled, [RELEASE] )
+
+    def test_state_followed_while_not_accepted(self):
+        self.at(0.0, PRESS)
+        self.handledNotes.clear()
+        self.at(0.1, RELEASE)
+        self.handledNotes.add(16)
+        self.at(0.2, PRESS)
+        self.assertEqual( self.delivered, [PRESS, RELEASE, PRESS] )
+
+
+class TestDebounceTime(unittest.TestCase):
+    def test_must_be_shorter_than_double_tap(self):
+        class SlowDebounce(BehringerFCB1010.BehringerFCB1010) :
+            DEBOUNCE_TIME = 0.3
+        self.assertRaises( ValueError, harness.ScriptHarness, SlowDebounce, harness.build_song(4, 4) )
+
+
+if __name__=='__main__' :
+    unittest.main()
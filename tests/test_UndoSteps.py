@@ -0,0 +1,49 @@
+"""
+How many undo steps BehringerFCB1010's pedal actions add, on the fake Live in benchmarks/fakes.
+
+    python2 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import harness
+import BehringerFCB1010
+
+
+class TestUndoSteps(unittest.TestCase):
+    def setUp(self):
+        self.song=harness.build_song(8, 6)
+        self.fcb=harness.ScriptHarness(BehringerFCB1010.create_instance, self.song)
+        self.clock=harness.VirtualClock(0.0)
+        self.fcb.script._scheduler.clock=self.clock
+
+    def tearDown(self):
+        self.fcb.disconnect()
+
+    def step(self, notes):
+        """
+        Presses the first pedal for an action and lets everything it starts finish. Returns how
+        many undo steps that added.
+        """
+        before=self.song._undo_steps
+        (msgType,channel,note)=notes[0]
+        self.fcb.press(note, channel)
+        self.clock.now+=0.1
+        self.fcb.release(note, channel)
+        for tick in xrange(20) :
+            self.clock.now+=0.1
+            self.fcb.tick()
+        return self.song._undo_steps-before
+
+    def test_begin_recording_adds_none(self):
+        for press in xrange(3) :
+            self.assertEqual( self.step(self.fcb.script.BEGIN_RECORDING_MIDI_NOTES), 0 )
+
+    def test_new_scene_is_one_step(self):
+        self.assertEqual( self.step(self.fcb.script.BEGIN_NEW_SCENE_MIDI_NOTES), 1 )
+
+
+if __name__=='__main__' :
+    unittest.main()